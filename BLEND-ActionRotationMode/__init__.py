@@ -34,7 +34,7 @@ import bpy
 
 from bpy.utils import (register_class, unregister_class)
 
-from . import (_functions_, _properties_, _operators_)
+from . import (_functions_, _properties_, _operators_, _channels_)
 
 JK_ARM_classes = (_properties_.JK_ARM_Operator_Props, _operators_.JK_OT_Set_Action_Rotation_Mode)
 
@@ -43,6 +43,11 @@ def register():
     for cls in JK_ARM_classes:
         register_class(cls)
     print("Classes registered...")
+    # the fcurve index can't be trusted after a load, undo or redo...
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update not in handlers:
+            handlers.append(_channels_.Channel_Index_Update)
+    print("Handlers appended...")
 
     bpy.types.DOPESHEET_MT_key.append(_functions_.Add_To_Menu)
     print("Operator appended...")
@@ -52,6 +57,11 @@ def unregister():
     for cls in reversed(JK_ARM_classes):
         unregister_class(cls)
     print("Classes unregistered...")
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update in handlers:
+            handlers.remove(_channels_.Channel_Index_Update)
+    _channels_.Clear_Channel_Index()
+    print("Handlers removed...")
     
     bpy.types.DOPESHEET_MT_key.remove(_functions_.Add_To_Menu)
     print("Operator removed...")
\ No newline at end of file
@@ -1,24 +1,29 @@
 import bpy
 import mathutils
+import numpy
+import os
+import sys
+import site
+import time
+import importlib.util
+import multiprocessing
+import concurrent.futures
+
+from . import (_kernels_, _channels_, _snapshots_)
 
 def Add_To_Menu(self, context):
     self.layout.operator("jk.switch_rotation_mode", text="Switch Rotation Mode")
 
 def Get_Rotation_Curves(action, rot_path_from, selection, object_curves):
-    rotation_curves = []
-    # if we have a pose bone selection to process...
-    if len(selection) > 0:
-        rotation_curves = rotation_curves + [fcurve for fcurve in action.fcurves 
-            if any(p_bone.name in fcurve.data_path for p_bone in selection) 
-            and any(fcurve.data_path.endswith(mode) for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle'])]
-    # if we want to edit the object rotation curves...
-    if object_curves:
-        rotation_curves = rotation_curves + [fcurve for fcurve in action.fcurves 
-            if any(fcurve.data_path == mode for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle'])]
-    # organise fcurves by their data paths...
-    curves_by_mode = {mode : {fcurve.data_path : {fc.array_index : fc for fc in rotation_curves if fc.data_path == fcurve.data_path} 
-        for fcurve in rotation_curves if fcurve.data_path.endswith(mode)} 
-        for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle']}  
+    # the selected pose bone names and an empty name if we want to edit the object rotation curves...
+    names = [p_bone.name for p_bone in selection] + ([""] if object_curves else [])
+    curves_by_mode = {mode : {} for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle']}
+    # organise fcurves by their data paths, looking them up from the actions channel index...
+    for name in names:
+        for mode, curves in curves_by_mode.items():
+            channels = _channels_.Get_Channel_Curves(action, name, mode)
+            if channels:
+                curves[channels[min(channels)].data_path] = channels
     
     return curves_by_mode
 
@@ -117,5 +122,281 @@ def Set_Rotation_Curves(action, mode_from, mode_to, remove, selection, object_cu
             if remove and not (is_from_euler and is_to_euler):
                 for fcurve in [fc for fc in action.fcurves if fc.data_path == d_path]:
                     action.fcurves.remove(fcurve)
+    # the curves we removed and re-added aren't caught by the fcurve count...
+    _channels_.Clear_Channel_Index(action)
     # get rid of the copy we operated on...
-    bpy.data.actions.remove(action_copy)
\ No newline at end of file
+    _channels_.Clear_Channel_Index(action_copy)
+    bpy.data.actions.remove(action_copy)
+
+# the per key settings that get copied rather than converted, enums come through foreach as their integer values...
+Key_enums = ['handle_left_type', 'handle_right_type', 'interpolation', 'easing', 'type']
+
+Key_floats = ['period', 'amplitude', 'back']
+
+def Get_Curve_Keys(fcurve, settings=False):
+    # read the coordinates and handles of every key straight into arrays...
+    count, keys = len(fcurve.keyframe_points), {}
+    for attr in ['co', 'handle_left', 'handle_right']:
+        values = numpy.empty(count * 2, dtype=numpy.float32)
+        fcurve.keyframe_points.foreach_get(attr, values)
+        keys[attr] = values.reshape(count, 2)
+    # and the settings if we want them...
+    if settings:
+        for attr in Key_enums + Key_floats:
+            keys[attr] = numpy.empty(count, dtype=numpy.int32 if attr in Key_enums else numpy.float32)
+            fcurve.keyframe_points.foreach_get(attr, keys[attr])
+    return keys
+
+def Set_Curve_Keys(fcurve, keys):
+    # add all the keys to the (new) fcurve in one go...
+    fcurve.keyframe_points.add(len(keys['co']))
+    # set any settings first so handle types are in place before the handles...
+    for attr in [a for a in Key_enums + Key_floats if a in keys]:
+        fcurve.keyframe_points.foreach_set(attr, keys[attr])
+    # then the coordinates and handles...
+    for attr in ['co', 'handle_left', 'handle_right']:
+        fcurve.keyframe_points.foreach_set(attr, numpy.ascontiguousarray(keys[attr], dtype=numpy.float32).ravel())
+    # and make sure everything is sorted and any automatic handles get recalculated...
+    fcurve.update()
+
+def Get_Key_Enum_Values(attr, identifiers):
+    # get the integer values of keyframe enums so we can compare and set them in arrays...
+    return [item.value for item in bpy.types.Keyframe.bl_rna.properties[attr].enum_items if item.identifier in identifiers]
+
+def Get_Curve_Values(fcurve, keys, frames):
+    values = numpy.empty(len(frames), dtype=numpy.float32)
+    key_frames = keys['co'][:, 0]
+    # if the curve has keys exactly on the frames we can read them from the arrays... (unless a modifier changes them)
+    if len(key_frames) > 0 and len(fcurve.modifiers) == 0:
+        indices = numpy.minimum(numpy.searchsorted(key_frames, frames), len(key_frames) - 1)
+        hits = key_frames[indices] == frames
+        values[hits] = keys['co'][indices[hits], 1]
+    else:
+        hits = numpy.zeros(len(frames), dtype=bool)
+    # and only evaluate the frames it doesn't have keys on...
+    for i in numpy.flatnonzero(~hits):
+        values[i] = fcurve.evaluate(float(frames[i]))
+    return values
+
+def Get_Curve_Samples(fcurve, keys, frames):
+    constant, linear = numpy.isin(keys['interpolation'], Get_Key_Enum_Values('interpolation', ['CONSTANT'])), numpy.isin(keys['interpolation'], Get_Key_Enum_Values('interpolation', ['LINEAR']))
+    bezier = numpy.isin(keys['interpolation'], Get_Key_Enum_Values('interpolation', ['BEZIER']))
+    # if the curve only uses constant, linear and bezier interpolation without modifiers we can sample it all at once...
+    if len(keys['co']) > 0 and len(fcurve.modifiers) == 0 and numpy.all(constant | linear | bezier):
+        first, last = keys['co'][0, 0], keys['co'][-1, 0]
+        inside = (frames >= first) & (frames <= last)
+        values = numpy.empty(len(frames))
+        values[inside] = _snapshots_.Get_Bezier_Values(keys['co'], keys['handle_left'], keys['handle_right'], constant, linear, frames[inside])
+        # frames outside the keys are easy if the extrapolation is constant...
+        if fcurve.extrapolation == 'CONSTANT':
+            values[frames < first], values[frames > last] = keys['co'][0, 1], keys['co'][-1, 1]
+        else:
+            for i in numpy.flatnonzero(~inside):
+                values[i] = fcurve.evaluate(float(frames[i]))
+    # otherwise every sample has to be evaluated...
+    else:
+        values = numpy.array([fcurve.evaluate(float(frame)) for frame in frames])
+    return values
+
+def Get_Rotation_Snapshot(action, mode_from, selection, object_curves, samples=0):
+    rot_path_from = "rotation_quaternion" if mode_from == 'QUATERNION' else "rotation_axis_angle" if mode_from == 'AXIS_ANGLE' else "rotation_euler"
+    # the default values of each channel for when a curve is missing...
+    defaults = ([1.0, 0.0, 0.0, 0.0] if mode_from == 'QUATERNION' else [0.0, 0.0, 1.0, 0.0] if mode_from == 'AXIS_ANGLE' else [0.0, 0.0, 0.0])
+    snapshot = {}
+    # only the rotation channels we are converting get read into arrays, so we never need a copy of the whole action...
+    for d_path, indices in Get_Rotation_Curves(action, rot_path_from, selection, object_curves)[rot_path_from].items():
+        curves = {}
+        for index, fcurve in indices.items():
+            curves[index] = Get_Curve_Keys(fcurve, settings=True)
+            curves[index]['group'] = fcurve.group.name if fcurve.group else ""
+            curves[index]['auto_smoothing'], curves[index]['extrapolation'] = fcurve.auto_smoothing, fcurve.extrapolation
+        # every frame any of the channels is keyed on...
+        frames = numpy.unique(numpy.concatenate([c['co'][:, 0] for c in curves.values()]))
+        # and all the channels evaluated on all those frames...
+        rotations = numpy.column_stack([Get_Curve_Values(indices[i], curves[i], frames) if i in indices 
+            else numpy.full(len(frames), defaults[i], dtype=numpy.float32) for i in range(len(defaults))])
+        snapshot[d_path] = {'frames' : frames, 'rotations' : rotations, 'curves' : curves}
+        # if we are fitting new keys we also want the channels sampled densely between the first and last frames...
+        if samples > 0:
+            times = numpy.unique(numpy.concatenate((frames, numpy.arange(frames[0], frames[-1], 1.0 / samples))))
+            sampled = numpy.column_stack([Get_Curve_Samples(indices[i], curves[i], times) if i in indices 
+                else numpy.full(len(times), defaults[i]) for i in range(len(defaults))])
+            snapshot[d_path]['samples'] = (times, sampled, frames)
+    return snapshot
+
+def Set_Rotation_Snapshot(action, snapshot, converted, mode_from, mode_to, remove):
+    # these two bool conditions would be annoying to keep calling on...
+    is_from_euler = True if mode_from in ['XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX'] else False
+    is_to_euler = True if mode_to in ['XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX'] else False
+    # get the strings we need for the to and from data paths...
+    rot_path_to = "rotation_quaternion" if mode_to == 'QUATERNION' else "rotation_axis_angle" if mode_to == 'AXIS_ANGLE' else "rotation_euler"
+    # new index is subtracted by 1 if we are switching to euler from quat/axis angle and + 1 if we are switching to quat/axis angle from euler...
+    shift = -1 if (is_to_euler and not is_from_euler) else 1 if (is_from_euler and not is_to_euler) else 0
+    # key types we copy over, anything else becomes a regular keyframe...
+    key_types, keyframe = Get_Key_Enum_Values('type', ['KEYFRAME', 'BREAKDOWN', 'MOVING_HOLD', 'EXTREME', 'JITTER']), Get_Key_Enum_Values('type', ['KEYFRAME'])[0]
+    # fitted keys get free bezier handles so nothing recalculates them...
+    free, bezier = Get_Key_Enum_Values('handle_left_type', ['FREE'])[0], Get_Key_Enum_Values('interpolation', ['BEZIER'])[0]
+    # iterate over the snapshot data paths and their converted rotations...
+    for d_path, snap in snapshot.items():
+        # get the base path without rotation string...
+        b_path = d_path[:-19] if mode_from in ['QUATERNION', 'AXIS_ANGLE'] else d_path[:-14]
+        # exact conversions come back as fitted keys for every channel we are switching to...
+        if isinstance(converted[d_path], dict):
+            source = snap['curves'][min(snap['curves'])]
+            for new_index, new_keys in converted[d_path].items():
+                # if the new curve already exists...
+                old_curve = action.fcurves.find(b_path + rot_path_to, index=new_index)
+                if old_curve:
+                    # remove it...
+                    action.fcurves.remove(old_curve)
+                new_curve = action.fcurves.new(data_path=b_path + rot_path_to, index=new_index, 
+                    action_group=source['group'] if source['group'] else b_path.partition('"')[2].split('"')[0])
+                new_curve.auto_smoothing = source['auto_smoothing']
+                new_curve.extrapolation = source['extrapolation']
+                count = len(new_keys['co'])
+                Set_Curve_Keys(new_curve, dict(new_keys, handle_left_type=numpy.full(count, free, dtype=numpy.int32), 
+                    handle_right_type=numpy.full(count, free, dtype=numpy.int32), interpolation=numpy.full(count, bezier, dtype=numpy.int32)))
+        # otherwise we have converted rotations on the frames that were keyed...
+        else:
+            frames, new_rots = snap['frames'], converted[d_path].astype(numpy.float32)
+            w_curve = None
+            # if we are coming from eulers to quat/axis angle...
+            if (is_from_euler and not is_to_euler):
+                # and there is already a w curve...
+                old_curve = action.fcurves.find(b_path + rot_path_to, index=0)
+                if old_curve:
+                    # remove it...
+                    action.fcurves.remove(old_curve)
+                # add a w curve...
+                w_curve = action.fcurves.new(data_path=b_path + rot_path_to, index=0, action_group=b_path.partition('"')[2].split('"')[0])
+            # iterate over the index and snapshot channel dictionary...
+            for index, old_keys in snap['curves'].items():
+                if not (index == 0 and (is_to_euler and not is_from_euler)):
+                    new_index = index + shift
+                    # if the new curve already exists... (if we are switching between eulers this is the curve we read from)
+                    old_curve = action.fcurves.find(b_path + rot_path_to, index=new_index)
+                    if old_curve:
+                        # remove it...
+                        action.fcurves.remove(old_curve)
+                    # add the new curve by adding the the base data path to the desired data path...
+                    if old_keys['group']:
+                        new_curve = action.fcurves.new(data_path=b_path + rot_path_to, index=new_index, action_group=old_keys['group'])
+                    else:
+                        new_curve = action.fcurves.new(data_path=b_path + rot_path_to, index=new_index)
+                    new_curve.auto_smoothing = old_keys['auto_smoothing']
+                    new_curve.extrapolation = old_keys['extrapolation']
+                    # pick out the converted values on the frames this curve had keys on...
+                    old_values = old_keys['co'][:, 1]
+                    new_values = new_rots[numpy.searchsorted(frames, old_keys['co'][:, 0]), new_index]
+                    # copy over the settings that don't need converting...
+                    new_keys = {attr : old_keys[attr] for attr in Key_enums + Key_floats}
+                    new_keys['type'] = numpy.where(numpy.isin(old_keys['type'], key_types), old_keys['type'], keyframe).astype(numpy.int32)
+                    # custom curve handles are the same close approximations as the per key conversion...
+                    divisors = numpy.where(old_values == 0, 1.0, old_values)
+                    new_keys['co'] = numpy.column_stack((old_keys['co'][:, 0], new_values))
+                    new_keys['handle_left'] = numpy.column_stack((old_keys['handle_left'][:, 0], new_values * (old_keys['handle_left'][:, 1] / divisors)))
+                    new_keys['handle_right'] = numpy.column_stack((old_keys['handle_right'][:, 0], new_values * (old_keys['handle_right'][:, 1] / divisors)))
+                    # then write all the keys in one go...
+                    Set_Curve_Keys(new_curve, new_keys)
+            # if we came from eulers we need to key w everytime any channel is keyed... (unable to support interpolation and custom handles on a curve that doesn't exist)
+            if w_curve != None:
+                w_co = numpy.column_stack((frames, new_rots[:, 0]))
+                Set_Curve_Keys(w_curve, {'co' : w_co, 'handle_left' : w_co, 'handle_right' : w_co})
+        # if we want to remove the old fcurves...
+        if remove and not (is_from_euler and is_to_euler):
+            for fcurve in [fc for fc in action.fcurves if fc.data_path == d_path]:
+                action.fcurves.remove(fcurve)
+    # the curves we removed and re-added aren't caught by the fcurve count...
+    _channels_.Clear_Channel_Index(action)
+
+def Set_Rotation_Curves_Batched(action, mode_from, mode_to, remove, selection, object_curves, exact=False, samples=4, tolerance=0.001):
+    # snapshot the rotation channels we are switching from... (instead of copying the entire action)
+    snapshot = Get_Rotation_Snapshot(action, mode_from, selection, object_curves, samples=samples if exact else 0)
+    # if we want exact handles, convert the dense samples and fit new keys to them...
+    if exact:
+        converted = _snapshots_.Get_Fitted_Snapshot({d_path : snap['samples'] for d_path, snap in snapshot.items()}, mode_from, mode_to, tolerance)
+    # otherwise convert all the keyed rotations of each data path in one go...
+    else:
+        converted = _snapshots_.Get_Converted_Snapshot({d_path : snap['rotations'] for d_path, snap in snapshot.items()}, mode_from, mode_to)
+    # then rewrite the curves from the snapshot...
+    Set_Rotation_Snapshot(action, snapshot, converted, mode_from, mode_to, remove)
+
+def Get_Worker_Module(module):
+    # worker processes can't import the add-on package (it imports bpy) so they need modules as their own top level ones...
+    name = module.__name__.split(".")[-1]
+    worker = sys.modules.get(name)
+    if worker == None:
+        spec = importlib.util.spec_from_file_location(name, module.__file__)
+        worker = importlib.util.module_from_spec(spec)
+        sys.modules[name] = worker
+        spec.loader.exec_module(worker)
+    # if something else already took that name we can't safely send our functions to workers...
+    return worker if os.path.samefile(worker.__file__, module.__file__) else None
+
+def Get_Worker_Kernels():
+    # the snapshots import the kernels, so the kernels need to be there first...
+    return Get_Worker_Module(_snapshots_) if Get_Worker_Module(_kernels_) != None else None
+
+def Set_Rotation_Curves_Pooled(actions, mode_from, mode_to, remove, selection, object_curves, workers, progress=None, exact=False, samples=4, tolerance=0.001):
+    start, kernels = time.perf_counter(), Get_Worker_Kernels()
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    # snapshot the rotation channels of every action up front...
+    snapshots = {action.name : Get_Rotation_Snapshot(action, mode_from, selection, object_curves, samples=samples if exact else 0) for action in actions}
+    jobs = {name : {d_path : snap['samples' if exact else 'rotations'] for d_path, snap in snapshot.items()} for name, snapshot in snapshots.items() if snapshot}
+    # the arguments each job gets sent with after its arrays...
+    args = (mode_from, mode_to, tolerance) if exact else (mode_from, mode_to)
+    # blender 2.90 still points sys.executable at the blender binary so workers need to be told where python is...
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(getattr(bpy.app, "binary_path_python", sys.executable))
+    done, total = 0, len(jobs)
+    # if there isn't enough to share around just convert everything here...
+    if kernels == None or workers == 1 or total < 2:
+        for name, rotations in jobs.items():
+            converted = _snapshots_.Get_Fitted_Snapshot(rotations, *args) if exact else _snapshots_.Get_Converted_Snapshot(rotations, *args)
+            Set_Rotation_Snapshot(bpy.data.actions[name], snapshots[name], converted, mode_from, mode_to, remove)
+            done = done + 1
+            if progress:
+                progress(done, total)
+    else:
+        # otherwise fan the conversions out to the workers... (they only ever see arrays)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, total), mp_context=context, 
+            initializer=site.addsitedir, initargs=(os.path.dirname(_kernels_.__file__),)) as executor:
+            kernel = kernels.Get_Fitted_Snapshot if exact else kernels.Get_Converted_Snapshot
+            futures = {executor.submit(kernel, rotations, *args) : name for name, rotations in jobs.items()}
+            # and write each action back on the main thread as soon as its conversion comes back...
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                Set_Rotation_Snapshot(bpy.data.actions[name], snapshots[name], future.result(), mode_from, mode_to, remove)
+                done = done + 1
+                if progress:
+                    progress(done, total)
+    print("Switched rotation mode of " + str(total) + " actions with " + str(min(workers, max(total, 1))) + " workers in " + str(round(time.perf_counter() - start, 3)) + " seconds...")
+
+def Set_Action_Rotation_Modes(actions, mode_from, mode_to, remove, selection, objects, object_curves, 
+    batched=True, pooled=False, workers=0, progress=None, exact=False, samples=4, tolerance=0.001):
+    # this needs no context, so it can be run from the operator or from a background script...
+    for selected in selection:
+        selected.rotation_mode = mode_from
+    # if we are editing object fcurves set the object rotation modes to the mode we are switching from...
+    if object_curves:
+        for obj in objects:
+            obj.rotation_mode = mode_from
+    # if we are converting lots of actions we can do it in parallel...
+    if batched and pooled and len(actions) > 1:
+        Set_Rotation_Curves_Pooled(actions, mode_from, mode_to, remove, selection, object_curves, workers, 
+            progress=progress, exact=exact, samples=samples, tolerance=tolerance)
+    # otherwise iterate over actions switching their rotation mode...
+    else:
+        for i, action in enumerate(actions):
+            if batched:
+                Set_Rotation_Curves_Batched(action, mode_from, mode_to, remove, selection, object_curves, exact=exact, samples=samples, tolerance=tolerance)
+            else:
+                Set_Rotation_Curves(action, mode_from, mode_to, remove, selection, object_curves)
+            if progress:
+                progress(i + 1, len(actions))
+    # set the selected pose bones and objects rotation modes to the mode we are switching to...
+    for selected in selection:
+        selected.rotation_mode = mode_to
+    if object_curves:
+        for obj in objects:
+            obj.rotation_mode = mode_to
\ No newline at end of file
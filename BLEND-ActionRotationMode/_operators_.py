@@ -19,25 +19,14 @@ class JK_OT_Set_Action_Rotation_Mode(bpy.types.Operator):
             selection = [p_bone for p_bone in bpy.context.selected_pose_bones] if self.Props.Selected else []
             # get objects that have active actions that will be edited...
             objects = [ob for ob in bpy.data.objects if ob.animation_data and any(ob.animation_data.action == action for action in actions)]  
-            # set the selected pose bones rotation modes to the mode we are switching from...
-            for selected in selection:
-                selected.rotation_mode = self.Props.Mode_from
-            # if we are editing object fcurves... 
-            if self.Props.Object:
-                # set object rotation modes to the mode we are switching from...
-                for obj in objects:
-                    obj.rotation_mode = self.Props.Mode_from
-            # iterate over actions switching their rotation mode...
-            for action in actions:
-                _functions_.Set_Rotation_Curves(action, self.Props.Mode_from, self.Props.Mode_to, self.Props.Remove, selection, self.Props.Object)
-            # set the selected pose bones rotation modes to the mode we are switching to...
-            for selected in selection:
-                selected.rotation_mode = self.Props.Mode_to
-            # if we are editing object fcurves... 
-            if self.Props.Object:
-                # set object rotation modes to the mode we are switching to...  
-                for obj in objects:
-                    obj.rotation_mode = self.Props.Mode_to
+            # only pool the conversions if we are doing all the actions...
+            pooled = self.Props.Pooled and not self.Props.Single
+            wm = context.window_manager
+            wm.progress_begin(0, len(actions))
+            _functions_.Set_Action_Rotation_Modes(actions, self.Props.Mode_from, self.Props.Mode_to, self.Props.Remove, selection, objects, self.Props.Object, 
+                batched=self.Props.Batched, pooled=pooled, workers=self.Props.Workers, progress=lambda done, total: wm.progress_update(done), 
+                exact=self.Props.Exact, samples=self.Props.Samples, tolerance=self.Props.Tolerance)
+            wm.progress_end()
         # if we can't execute...
         else:
             # explain why...
@@ -63,11 +52,23 @@ class JK_OT_Set_Action_Rotation_Mode(bpy.types.Operator):
         row = layout.row()
         row.prop(self.Props, "Single")
         row.prop(self.Props, "Remove")
+        row.prop(self.Props, "Batched")
         row = layout.row()
         row.prop_search(self.Props, "name", bpy.data, "actions", text="Action")
         # disable the action selection if we aren't doing a single action...
         row.enabled = self.Props.Single
         row = layout.row()
+        row.prop(self.Props, "Pooled")
+        row.prop(self.Props, "Workers")
+        # multi-processing only happens when we are batching all actions...
+        row.enabled = self.Props.Batched and not self.Props.Single
+        row = layout.row()
+        row.prop(self.Props, "Exact")
+        row.prop(self.Props, "Samples")
+        row.prop(self.Props, "Tolerance")
+        # fitting exact handles only happens in batched mode...
+        row.enabled = self.Props.Batched
+        row = layout.row()
         row.prop(self.Props, "Mode_from")
         row.prop(self.Props, "Mode_to")
         row = layout.row()
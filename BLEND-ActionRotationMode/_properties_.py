@@ -1,6 +1,6 @@
 import bpy
 
-from bpy.props import (EnumProperty, BoolProperty, StringProperty, CollectionProperty)
+from bpy.props import (EnumProperty, BoolProperty, StringProperty, CollectionProperty, IntProperty, FloatProperty)
 
 class JK_ARM_Operator_Props(bpy.types.PropertyGroup):
     
@@ -32,4 +32,16 @@ class JK_ARM_Operator_Props(bpy.types.PropertyGroup):
     
     Selected: BoolProperty(name="Edit Selected Bones", description="Edit selected pose bone fcurves. (No bone fcurves will be edited if False)", default=False)
     
-    Object: BoolProperty(name="Edit Object Curves", description="Edit object rotation fcurves. (If there are any)", default=False)
\ No newline at end of file
+    Object: BoolProperty(name="Edit Object Curves", description="Edit object rotation fcurves. (If there are any)", default=False)
+
+    Batched: BoolProperty(name="Batched", description="Convert all the keys of each rotation at once using arrays. (Copies the whole action and converts key by key if False)", default=True)
+
+    Pooled: BoolProperty(name="Multi-Process", description="Convert actions in parallel worker processes. (Only when editing all actions in batched mode)", default=False)
+
+    Workers: IntProperty(name="Workers", description="How many worker processes to convert actions with. (0 uses one per CPU core)", default=0, min=0)
+
+    Exact: BoolProperty(name="Exact Handles", description="Sample the curves and fit new keys and handles to the converted rotations. (Only in batched mode, keys are added where needed)", default=False)
+
+    Samples: IntProperty(name="Samples", description="How many samples per frame to fit exact handles to", default=4, min=1, max=64)
+
+    Tolerance: FloatProperty(name="Tolerance", description="How far fitted curves can stray from the converted samples before more keys get added", default=0.001, min=0.000001, precision=6)
\ No newline at end of file
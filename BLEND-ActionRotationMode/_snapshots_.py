@@ -0,0 +1,87 @@
+import numpy
+
+# the snapshot conversions and keyframe fitting only rotation mode switching needs, worker processes get sent these...
+# (so like the kernels nothing in here should ever need bpy, and it has to import as a top level module too)
+try:
+    from . import _kernels_
+except ImportError:
+    import _kernels_
+
+def Get_Converted_Snapshot(rotations, mode_from, mode_to):
+    # convert the rotations of every data path in a snapshot, this is what worker processes get sent...
+    return {d_path : _kernels_.Get_Converted_Rotations(rots.astype(numpy.float64), mode_from, mode_to) for d_path, rots in rotations.items()}
+
+def Get_Bezier_Values(co, handle_left, handle_right, constant, linear, frames):
+    # evaluate keyframes at frames inside their range, interpolating each segment by its first keys mode...
+    co, handle_left, handle_right = co.astype(numpy.float64), handle_left.astype(numpy.float64), handle_right.astype(numpy.float64)
+    if len(co) == 1:
+        return numpy.full(len(frames), co[0, 1])
+    segments = numpy.clip(numpy.searchsorted(co[:, 0], frames, side='right') - 1, 0, len(co) - 2)
+    p0, p3 = co[segments], co[segments + 1]
+    p1, p2 = handle_right[segments], handle_left[segments + 1]
+    # handles that overlap each other in time get scaled back like Blender does...
+    width = p3[:, 0] - p0[:, 0]
+    len1, len2 = numpy.abs(p0[:, 0] - p1[:, 0]), numpy.abs(p2[:, 0] - p3[:, 0])
+    scale = numpy.where(len1 + len2 > width, width / numpy.where(len1 + len2 > 0.0, len1 + len2, 1.0), 1.0)[:, None]
+    p1, p2 = p0 + (p1 - p0) * scale, p3 + (p2 - p3) * scale
+    # then find how far along each segment the frames are... (x is monotonic so bisection always gets there)
+    lower, upper = numpy.zeros(len(frames)), numpy.ones(len(frames))
+    for i in range(32):
+        t = (lower + upper) * 0.5
+        x = ((1 - t) ** 3) * p0[:, 0] + 3 * ((1 - t) ** 2) * t * p1[:, 0] + 3 * (1 - t) * (t ** 2) * p2[:, 0] + (t ** 3) * p3[:, 0]
+        lower, upper = numpy.where(x < frames, t, lower), numpy.where(x < frames, upper, t)
+    t = (lower + upper) * 0.5
+    values = ((1 - t) ** 3) * p0[:, 1] + 3 * ((1 - t) ** 2) * t * p1[:, 1] + 3 * (1 - t) * (t ** 2) * p2[:, 1] + (t ** 3) * p3[:, 1]
+    # linear and constant segments are much simpler...
+    factors = (frames - p0[:, 0]) / numpy.where(width > 0.0, width, 1.0)
+    values = numpy.where(linear[segments], p0[:, 1] + (p3[:, 1] - p0[:, 1]) * factors, values)
+    values = numpy.where(constant[segments], p0[:, 1], values)
+    # and frames that land on the last key are just its value...
+    return numpy.where(frames >= co[-1, 0], co[-1, 1], values)
+
+def Get_Fitted_Bezier_Keys(times, values, knots, tolerance, iterations=16):
+    # fit bezier keys through the samples at the knots, adding knots where the curve strays too far... 
+    times, values, knots = times.astype(numpy.float64), values.astype(numpy.float64), numpy.unique(knots)
+    x, y = times[knots], values[knots]
+    if len(knots) < 2:
+        return {'co' : numpy.column_stack((x, y)), 'handle_left' : numpy.column_stack((x - 1.0, y)), 'handle_right' : numpy.column_stack((x + 1.0, y))}
+    for iteration in range(iterations + 1):
+        x, y = times[knots], values[knots]
+        count, widths = len(knots) - 1, x[1:] - x[:-1]
+        # which segment every sample falls in and how far along it they are... (handles at thirds keep time linear)
+        segments = numpy.clip(numpy.searchsorted(x, times, side='right') - 1, 0, count - 1)
+        t = (times - x[segments]) / widths[segments]
+        b0, b1, b2, b3 = (1 - t) ** 3, 3 * ((1 - t) ** 2) * t, 3 * (1 - t) * (t ** 2), t ** 3
+        residuals = values - b0 * y[segments] - b3 * y[segments + 1]
+        # least squares for the two inner handle values of every segment at once, leaning towards straight lines when underdetermined...
+        ridge, lin1, lin2 = 1e-9, y[:-1] + (y[1:] - y[:-1]) / 3.0, y[:-1] + (y[1:] - y[:-1]) * 2.0 / 3.0
+        a11 = numpy.bincount(segments, b1 * b1, count) + ridge
+        a12 = numpy.bincount(segments, b1 * b2, count)
+        a22 = numpy.bincount(segments, b2 * b2, count) + ridge
+        r1 = numpy.bincount(segments, b1 * residuals, count) + ridge * lin1
+        r2 = numpy.bincount(segments, b2 * residuals, count) + ridge * lin2
+        det = a11 * a22 - a12 * a12
+        h1, h2 = (r1 * a22 - r2 * a12) / det, (a11 * r2 - a12 * r1) / det
+        # see how far the fitted curve is from the samples...
+        errors = numpy.abs(b0 * y[segments] + b1 * h1[segments] + b2 * h2[segments] + b3 * y[segments + 1] - values)
+        if iteration == iterations or errors.max() <= tolerance:
+            break
+        # and split any segment that strays too far at its middle sample... (the worst sample tends to sit right next to a key)
+        strays = numpy.flatnonzero(numpy.bincount(segments[errors > tolerance], minlength=count))
+        middles = numpy.setdiff1d(numpy.searchsorted(times, (x[strays] + x[strays + 1]) * 0.5), knots)
+        if len(middles) == 0:
+            break
+        knots = numpy.union1d(knots, middles)
+    # inner handles come straight from the fit and the outer handles mirror them...
+    handle_left = numpy.column_stack((numpy.concatenate(([x[0] - widths[0] / 3.0], x[1:] - widths / 3.0)), numpy.concatenate(([2.0 * y[0] - h1[0]], h2))))
+    handle_right = numpy.column_stack((numpy.concatenate((x[:-1] + widths / 3.0, [x[-1] + widths[-1] / 3.0])), numpy.concatenate((h1, [2.0 * y[-1] - h2[-1]]))))
+    return {'co' : numpy.column_stack((x, y)), 'handle_left' : handle_left, 'handle_right' : handle_right}
+
+def Get_Fitted_Snapshot(samples, mode_from, mode_to, tolerance):
+    # convert the dense samples of every data path and fit new bezier keys to each channel, workers get sent this when fitting...
+    fitted = {}
+    for d_path, (times, rotations, frames) in samples.items():
+        converted = _kernels_.Get_Converted_Rotations(rotations.astype(numpy.float64), mode_from, mode_to, continuous=True)
+        knots = numpy.searchsorted(times, frames)
+        fitted[d_path] = {index : Get_Fitted_Bezier_Keys(times, converted[:, index], knots, tolerance) for index in range(converted.shape[1])}
+    return fitted
@@ -45,15 +45,19 @@ from bpy.utils import (register_class, unregister_class)
 
 from . import (_functions_, _properties_, _operators_)
 
-JK_SAL_classes = (_properties_.JK_SAL_Operator_Props, _operators_.JK_OT_Set_Action_Length)
+JK_SAL_classes = (_properties_.JK_SAL_Operator_Props, _properties_.JK_SAL_Action_Props, _operators_.JK_OT_Scale_Action_Length)
 
 def register():
     for cls in JK_SAL_classes:
         register_class(cls)
 
+    bpy.types.Action.SAL = bpy.props.PointerProperty(type=_properties_.JK_SAL_Action_Props)
+
     bpy.types.DOPESHEET_MT_key.append(_functions_.Add_To_Menu)
         
 def unregister():
+    del bpy.types.Action.SAL
+    
     for cls in reversed(JK_SAL_classes):
         unregister_class(cls)
     
@@ -1,88 +1,192 @@
 import bpy
+import numpy
+import time
 
 # adds operator to menu...
 def Add_To_Menu(self, context):
-    self.layout.operator("jk.switch_transform_space", text="Switch Transform Space")
+    self.layout.operator("jk.scale_action_length", text="Scale Action Length")
+
+def Get_Curve_Times(fcurve):
+    # get the keyframe and handle coordinates in flat arrays... (x, y, x, y...)
+    count = len(fcurve.keyframe_points) * 2
+    co, handle_left, handle_right = numpy.empty(count, dtype=numpy.float32), numpy.empty(count, dtype=numpy.float32), numpy.empty(count, dtype=numpy.float32)
+    fcurve.keyframe_points.foreach_get('co', co)
+    fcurve.keyframe_points.foreach_get('handle_left', handle_left)
+    fcurve.keyframe_points.foreach_get('handle_right', handle_right)
+    return co, handle_left, handle_right
+
+def Set_Curve_Times(fcurve, co, handle_left, handle_right):
+    # write the coordinates back in one go...
+    fcurve.keyframe_points.foreach_set('co', co)
+    fcurve.keyframe_points.foreach_set('handle_left', handle_left)
+    fcurve.keyframe_points.foreach_set('handle_right', handle_right)
+    # and let blender sort the keys and recalculate any auto handles...
+    fcurve.update()
+
+def Scale_Curve_Times(fcurve, scale, offset):
+    if len(fcurve.keyframe_points):
+        times = Get_Curve_Times(fcurve)
+        # only the x coordinates (time) get scaled, around the offset frame...
+        for array in times:
+            array[0::2] = offset + (array[0::2] - offset) * scale
+        Set_Curve_Times(fcurve, *times)
+
+def Scale_Action_Times(action, scale, offset):
+    # no context or dope sheet needed, so this works in the background too...
+    for fcurve in action.fcurves:
+        Scale_Curve_Times(fcurve, scale, offset)
+
+def Get_Curve_Selection(fcurve):
+    # get which keys have their control point selected...
+    selection = numpy.empty(len(fcurve.keyframe_points), dtype=bool)
+    fcurve.keyframe_points.foreach_get('select_control_point', selection)
+    return selection
+
+def Scale_Selected_Times(action, scale, offset):
+    # get the times and selections of every fcurve first... (wish we had context.selected_keyframes)
+    curves = [(fcurve, Get_Curve_Times(fcurve), Get_Curve_Selection(fcurve)) for fcurve in action.fcurves if len(fcurve.keyframe_points)]
+    selected = [times[0][0::2][selection] for _, times, selection in curves if selection.any()]
+    # if nothing is selected there is nothing to scale...
+    if not selected:
+        return False
+    # the selected block spans from the first selected key to the last in any fcurve, so every channel stays in sync...
+    start_frame, end_frame = min(frames.min() for frames in selected), max(frames.max() for frames in selected)
+    # keys after the block get shifted along by however much the end of the block moved...
+    shift = (offset + (end_frame - offset) * scale) - end_frame
+    for fcurve, times, _ in curves:
+        frames = times[0][0::2]
+        # keys inside the block get scaled and keys after it get shifted, keys before it stay put... (handles follow their keys)
+        inside, after = (frames >= start_frame) & (frames <= end_frame), frames > end_frame
+        if inside.any() or after.any():
+            for array in times:
+                array[0::2][inside] = offset + (array[0::2][inside] - offset) * scale
+                array[0::2][after] = array[0::2][after] + shift
+            Set_Curve_Times(fcurve, *times)
+    return True
 
 def Scale_By_Framerate(action, fps_from, fps_to, offset, selected):
+    # framerate changes always scale around the offset frame, the same as retiming the whole library does...
     if selected:
-        # iterate over the fcurves... (wish we had context.selected_keyframes)
-        for fcurve in action.fcurves:
-            # make sure the keys are in chronological order... (this is important)
-            fcurve.update()
-            # get our selection...
-            selected_keys = [key for key in fcurve.keyframe_points if key.select_control_point]
-            # we need the start and end frames...
-            start_frame = selected_keys[0].co[0]
-            end_frame = selected_keys[-1].co[0]
-            # then check every key...
-            for key in fcurve.keyframe_points:
-                # if the keyframe comes after the end frame of the selection...
-                if key.co[0] > end_frame:
-                    # we need to shift it along by the amount we are scaling the selected keys by...
-                    addition = (end_frame - offset) * (fps_to / fps_from)
-                    key.co[0] = key.co[0] + addition
-                    key.handle_left[0] = key.handle_left[0] + addition
-                    key.handle_right[0] = key.handle_right[0] + addition
-                elif key.co[0] < start_frame:
-                    print("Pre-Frame")
-                else:
-                    (key.co[0] - offset) * (fps_to / fps_from)
-                    key.co[0] = key.co[0] + addition
-                    key.handle_left[0] = key.handle_left[0] + addition
-                    key.handle_right[0] = key.handle_right[0] + addition
+        # scale the selected keys by fps_to divided by fps_from... (returning whether there were any)
+        return Scale_Selected_Times(action, fps_to / fps_from, offset)
     else:
-        # switch to the dope sheet...
-        last_area = bpy.context.area.type
-        bpy.context.area.type = 'DOPESHEET_EDITOR'
-        # set the ui_mode...
-        last_ui_mode = bpy.context.space_data.ui_mode
-        bpy.context.space_data.ui_mode = 'ACTION'
-        # set the auto snapping...
-        last_auto_snap = bpy.context.space_data.auto_snap
-        bpy.context.space_data.auto_snap = 'NONE'
-        # set the current frame to the first frame of the animation...
-        last_current_frame = bpy.context.scene.frame_current
-        bpy.context.scene.frame_current = action.frame_range[0]
-        # select all the keys...
-        bpy.ops.action.select_all(action='SELECT')
-        # scale the keyframes by fps_to divided by fps_from...
-        bpy.ops.transform.transform(mode='TIME_SCALE', value=(fps_to / fps_from, 0, 0, 0), orient_axis='X', orient_type='VIEW', 
-            orient_matrix=((-1, -0, -0), (-0, -1, -0), (-0, -0, -1)), orient_matrix_type='VIEW', mirror=True, 
-            use_proportional_edit=False, proportional_edit_falloff='SMOOTH', proportional_size=1, 
-            use_proportional_connected=False, use_proportional_projected=False)
-        # return the area back to what it was...
-        bpy.context.scene.frame_current = last_current_frame
-        bpy.context.space_data.auto_snap = last_auto_snap
-        bpy.context.space_data.ui_mode = last_ui_mode
-        bpy.context.area.type = last_area
+        # scale every key and handle by fps_to divided by fps_from...
+        Scale_Action_Times(action, fps_to / fps_from, offset)
+        return True
 
 def Scale_By_Length(action, fps, offset, seconds, selection):
-    # switch to the dope sheet...
-    last_area = bpy.context.area.type
-    bpy.context.area.type = 'DOPESHEET_EDITOR'
-    # set the ui_mode...
-    last_ui_mode = bpy.context.space_data.ui_mode
-    bpy.context.space_data.ui_mode = 'ACTION'
-    # set the auto snapping...
-    last_auto_snap = bpy.context.space_data.auto_snap
-    bpy.context.space_data.auto_snap = 'NONE'
-    # set the current frame to the first frame of the animation...
-    last_current_frame = bpy.context.scene.frame_current
-    bpy.context.scene.frame_current = action.frame_range[0]
-    # select all the keys...
-    bpy.ops.action.select_all(action='SELECT')
     # divide desired length by old length to get scaling value...
     scaling = (fps * seconds) / (action.frame_range[1] - action.frame_range[0])
-    # scale the keyframes by...
-    bpy.ops.transform.transform(mode='TIME_SCALE', value=(scaling, 0, 0, 0), orient_axis='X', orient_type='VIEW', 
-        orient_matrix=((-1, -0, -0), (-0, -1, -0), (-0, -0, -1)), orient_matrix_type='VIEW', mirror=True, 
-        use_proportional_edit=False, proportional_edit_falloff='SMOOTH', proportional_size=1, 
-        use_proportional_connected=False, use_proportional_projected=False)
-    # return the area back to what it was...
-    bpy.context.scene.frame_current = last_current_frame
-    bpy.context.space_data.auto_snap = last_auto_snap
-    bpy.context.space_data.ui_mode = last_ui_mode
-    bpy.context.area.type = last_area
-    # set the render fps to what it was before importing...
-    #bpy.context.scene.render.fps = self.Start
\ No newline at end of file
+    # then scale every key and handle around the first frame by it...
+    Scale_Action_Times(action, scaling, action.frame_range[0])
+
+def Get_Animated_Datas():
+    # all the id collections that can have animation data with nla tracks on them...
+    datas = []
+    for collection in [bpy.data.objects, bpy.data.shape_keys, bpy.data.materials, bpy.data.cameras, bpy.data.lights, bpy.data.worlds, bpy.data.scenes]:
+        datas = datas + [data for data in collection if data.animation_data]
+    return datas
+
+def Get_Data_Scenes(datas):
+    # which scenes each animated data ends up in, following its users up until we hit objects or scenes...
+    users, scenes = bpy.data.user_map(subset=set(datas)), {}
+    for data in datas:
+        found, stack, seen = set(), [data], {data}
+        while stack:
+            user = stack.pop()
+            if isinstance(user, bpy.types.Scene):
+                found.add(user)
+            elif isinstance(user, bpy.types.Object):
+                found.update(user.users_scene)
+            else:
+                # (anything we haven't mapped yet gets looked up on its own)
+                if user not in users:
+                    users.update(bpy.data.user_map(subset={user}))
+                for parent in users[user] - seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        scenes[data] = found
+    return scenes
+
+def Scale_Strip_Times(strip, scale, offset, action_scale):
+    # get the strips timeline range before touching its action range, setting that makes blender recalculate the strips end...
+    frame_start, frame_end = strip.frame_start, strip.frame_end
+    # if the strips action was retimed its frame range inside the action needs to follow the keys...
+    if action_scale != 1.0:
+        start, end = offset + (strip.action_frame_start - offset) * action_scale, offset + (strip.action_frame_end - offset) * action_scale
+        # setting them in the right order stops blender clamping one against the other...
+        if action_scale > 1.0:
+            strip.action_frame_end, strip.action_frame_start = end, start
+        else:
+            strip.action_frame_start, strip.action_frame_end = start, end
+    # and if the timeline was retimed the strip gets moved along it...
+    if scale != 1.0:
+        start = offset + (frame_start - offset) * scale
+        # strips of retimed actions get scaled with the timeline, but if the action wasn't retimed stretching the strip would change its playback speed...
+        end = offset + (frame_end - offset) * scale if action_scale != 1.0 else start + (frame_end - frame_start)
+        # (same order rules apply, end first when the strip is moving later)
+        if end > strip.frame_end:
+            strip.frame_end, strip.frame_start = end, start
+        else:
+            strip.frame_start, strip.frame_end = start, end
+
+def Scale_Scene_Times(scene, scale, offset):
+    # scale the markers...
+    for marker in scene.timeline_markers:
+        marker.frame = round(offset + (marker.frame - offset) * scale)
+    # and the frame ranges... (end first when scaling up so the start never gets clamped by the end)
+    for prop_start, prop_end in [("frame_start", "frame_end"), ("frame_preview_start", "frame_preview_end")]:
+        start, end = round(offset + (getattr(scene, prop_start) - offset) * scale), round(offset + (getattr(scene, prop_end) - offset) * scale)
+        if scale > 1.0:
+            setattr(scene, prop_end, end)
+            setattr(scene, prop_start, start)
+        else:
+            setattr(scene, prop_start, start)
+            setattr(scene, prop_end, end)
+    scene.frame_current = round(offset + (scene.frame_current - offset) * scale)
+    return len(scene.timeline_markers)
+
+def Retime_Library(fps_from, fps_to, offset, set_fps=True):
+    start_time = time.perf_counter()
+    report = {'actions' : 0, 'skipped' : 0, 'strips' : 0, 'markers' : 0, 'scenes' : 0}
+    # group the work by action, each one scales from its own stored framerate... (or fps_from if it was never scaled)
+    retimed = {}
+    for action in bpy.data.actions:
+        fps_action = action.SAL.Framerate if action.SAL.Framerate else fps_from
+        # if the action is already at the target framerate it can be skipped...
+        if fps_action == fps_to:
+            report['skipped'] += 1
+            continue
+        retimed[action] = fps_to / fps_action
+        Scale_Action_Times(action, retimed[action], offset)
+        action.SAL.Framerate = fps_to
+        report['actions'] += 1
+    # each scenes timeline goes from its own framerate to fps_to, unless it's already there...
+    scales = {scene : fps_to / scene.render.fps for scene in bpy.data.scenes if scene.render.fps != fps_to}
+    # strips on the nla tracks need to follow their retimed actions and the timeline they sit on...
+    if retimed or scales:
+        datas = Get_Animated_Datas()
+        for data, scenes in Get_Data_Scenes(datas).items():
+            # (data that isn't in any scene doesn't sit on a timeline, so its strips only follow their actions)
+            timelines = sorted({scales.get(scene, 1.0) for scene in scenes}) or [1.0]
+            if len(timelines) > 1:
+                print("'Scale Action Length' found " + data.name + " in scenes with different framerates, its strips follow the most scaled timeline...")
+            scale = timelines[-1]
+            for track in data.animation_data.nla_tracks:
+                # strips can't overlap, so go backwards when scaling up and forwards when scaling down...
+                strips = sorted(track.strips, key=lambda strip: strip.frame_start, reverse=scale > 1.0)
+                for strip in strips:
+                    action_scale = retimed.get(strip.action, 1.0)
+                    if action_scale != 1.0 or scale != 1.0:
+                        Scale_Strip_Times(strip, scale, offset, action_scale)
+                        report['strips'] += 1
+    for scene, scale in scales.items():
+        report['markers'] += Scale_Scene_Times(scene, scale, offset)
+        report['scenes'] += 1
+        # maybe set the render fps...
+        if set_fps:
+            scene.render.fps = fps_to
+    report['seconds'] = time.perf_counter() - start_time
+    print("Retimed " + str(report['actions']) + " actions (" + str(report['skipped']) + " skipped), " + str(report['strips']) + " strips and " 
+        + str(report['markers']) + " markers in " + str(report['scenes']) + " scenes in " + str(round(report['seconds'], 3)) + " seconds...")
+    return report
\ No newline at end of file
@@ -6,59 +6,74 @@ class JK_OT_Scale_Action_Length(bpy.types.Operator):
     """Scales actions to a framerate or length in seconds"""
     bl_idname = "jk.scale_action_length"
     bl_label = "Scale Action Length"
+    bl_options = {'REGISTER', 'UNDO'}
     
     Props: PointerProperty(type=_properties_.JK_SAL_Operator_Props)
     
     def execute(self, context):
         # get the actions...
-        actions = [bpy.data.actions[self.Props.name]] if self.Props.Single else [action for action in bpy.data.actions]
+        actions = [bpy.data.actions[self.Props.name]] if self.Props.Single and self.Props.name in bpy.data.actions else [] if self.Props.Single else [action for action in bpy.data.actions]
         # check which scaling method to use...
         if self.Props.Length_mode == 'FPS':
             # check if we can execute correctly...
-            if self.Props.FPS_from != self.Props.FPS_to:
-                # run scaling on those actions...
-                for action in actions:
-                    Scale_By_Framerate(action, self.Props.FPS_from, self.Props.FPS_to, False)
-                # maybe set the render fps...
-                if self.Props.Set_fps:
-                    bpy.context.scene.render.fps = self.Props.FPS_to
+            if self.Props.Framerate_from != self.Props.Framerate_to:
+                # if we are doing every action, retime the whole library in one pass... (strips, markers and scene ranges included)
+                if not self.Props.Single:
+                    _functions_.Retime_Library(self.Props.Framerate_from, self.Props.Framerate_to, self.Props.Playhead_offset, set_fps=self.Props.Set_fps)
+                else:
+                    # otherwise run scaling on the single action...
+                    for action in actions:
+                        if not _functions_.Scale_By_Framerate(action, self.Props.Framerate_from, self.Props.Framerate_to, self.Props.Playhead_offset, self.Props.Selected):
+                            self.report({'WARNING'}, "No keyframes are selected on " + action.name + ", nothing was scaled")
+                        # only remember its new framerate if the whole action got retimed, a partial retime isn't at the new framerate...
+                        elif not self.Props.Selected:
+                            action.SAL.Framerate = self.Props.Framerate_to
+                            # and maybe set the render fps...
+                            if self.Props.Set_fps:
+                                bpy.context.scene.render.fps = self.Props.Framerate_to
+                            self.report({'INFO'}, "Retimed " + action.name + " from " + str(self.Props.Framerate_from) + " to " + str(self.Props.Framerate_to) + " FPS")
             # if that condition failed i hope you misclicked lol
             else:
                 print("'Scale_Action_Length' cannot execute as there's no need to scale to the same FPS...")
         elif self.Props.Length_mode == 'LENGTH':
-            # get the actions...
-            actions = [bpy.data.actions[self.Props.name]] if self.Props.Single else [action for action in bpy.data.actions]
-            # run scaling on those actions...
-            for action in actions:
-                Scale_By_Length(action, self.Props., offset, seconds, selection)
+            # check if we can execute correctly...
+            if self.Props.Playhead_length > 0.0:
+                # run scaling on those actions... (that have some length to scale)
+                for action in actions:
+                    if action.frame_range[1] > action.frame_range[0]:
+                        _functions_.Scale_By_Length(action, bpy.context.scene.render.fps, self.Props.Playhead_offset, self.Props.Playhead_length, False)
+            else:
+                print("'Scale_Action_Length' cannot execute as actions can't be scaled to no length...")
         # job done!
         return {'FINISHED'}
     
     def invoke(self, context, event):
         wm = context.window_manager
-        # if selected pose bones is not valid...
-        if not bpy.context.selected_pose_bones:
-            # make sure the selected bool is false...
-            self.Props.Selected = False
-            # and set the object bool to be true...
-            self.Props.Object = True
+        # default to the active objects action if there is one...
+        if context.object and context.object.animation_data and context.object.animation_data.action:
+            self.Props.name = context.object.animation_data.action.name
         return wm.invoke_props_dialog(self)
     
     def draw(self, context):
         layout = self.layout
         row = layout.row()
+        row.prop(self.Props, "Length_mode")
         row.prop(self.Props, "Single")
-        row.prop(self.Props, "Remove")
         row = layout.row()
         row.prop_search(self.Props, "name", bpy.data, "actions", text="Action")
         # disable the action selection if we aren't doing a single action...
         row.enabled = self.Props.Single
         row = layout.row()
-        row.prop(self.Props, "Mode_from")
-        row.prop(self.Props, "Mode_to")
-        row = layout.row()
-        row.prop(self.Props, "Object")
-        col = row.column()
-        col.prop(self.Props, "Selected")
-        # disable selected bool if there are no selected pose bones...
-        col.enabled = True if bpy.context.selected_pose_bones else False
\ No newline at end of file
+        # show the framerates or the playhead depending on the mode...
+        if self.Props.Length_mode == 'FPS':
+            row.prop(self.Props, "Framerate_from")
+            row.prop(self.Props, "Framerate_to")
+            row = layout.row()
+            row.prop(self.Props, "Set_fps")
+            row.prop(self.Props, "Playhead_offset")
+            row = layout.row()
+            row.prop(self.Props, "Selected")
+            # selected keys can only be scaled on a single action...
+            row.enabled = self.Props.Single
+        else:
+            row.prop(self.Props, "Playhead_length")
\ No newline at end of file
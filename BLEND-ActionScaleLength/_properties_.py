@@ -14,7 +14,7 @@ class JK_SAL_Operator_Props(bpy.types.PropertyGroup):
     Framerate_to: IntProperty(name="FPS To", description="The framerate we are changing to", default=30, min=1, 
         subtype='NONE', update=None, get=None, set=None)
 
-    Playhead_offset: FloatProperty(name="Offset", description="The start offset. (in keyframes)", default=0.0, min=0, step=1, 
+    Playhead_offset: FloatProperty(name="Offset", description="The frame that framerate changes scale keyframes, strips and markers around", default=0.0, min=0, step=1, 
         precision=3, subtype='TIME', unit='TIME', update=None, get=None, set=None)
     
     Playhead_length: FloatProperty(name="Length", description="The desired action length relative to the current scene FPS. (in seconds)", default=0.0, min=0, step=1, 
@@ -24,7 +24,7 @@ class JK_SAL_Operator_Props(bpy.types.PropertyGroup):
     
     Single: BoolProperty(name="Single Action", description="Only edit the selected action. (Edit all actions if False)", default=True)
 
-    Selected: BoolProperty(name="Set Framerate", description="Only edit the selected keyframes. (Edit all keyframes if False)", default=True)
+    Selected: BoolProperty(name="Selected Keys", description="Only scale the selected keyframes around the offset and shift the keyframes after them. (Edit all keyframes if False)", default=False)
 
     Set_fps: BoolProperty(name="Set Framerate", description="Set the scenes framerate after scaling", default=True)
 
@@ -35,7 +35,7 @@ class JK_SAL_Action_Props(bpy.types.PropertyGroup):
         ('LENGTH', 'Playhead', "Set action to fit the given playtime")],
         default='FPS')
 
-    Framerate: IntProperty(name="FPS", description="The framerate associated with this action", default=24, min=1, 
+    Framerate: IntProperty(name="FPS", description="The framerate associated with this action. (0 if it has never been scaled)", default=0, min=0, 
         subtype='NONE', update=None, get=None, set=None)
 
     Playhead: FloatProperty(name="Length", description="The current action length relative to the current scene FPS. (in seconds)", default=0.0, min=0, step=1, 
@@ -36,7 +36,7 @@ import bpy
 
 from bpy.utils import (register_class, unregister_class)
 
-from . import (_properties_, _operators_, _interface_)
+from . import (_properties_, _operators_, _interface_, _functions_, _channels_)
 
 JK_AAR_classes = (
     # properties...
@@ -46,12 +46,16 @@ JK_AAR_classes = (
     _properties_.JK_AAR_Pose_Bone_Props, 
     _properties_.JK_AAR_Offset_Action_Slot_Props, 
     _properties_.JK_AAR_Offset_Slot_Props, 
+    _properties_.JK_AAR_Action_Props,
     _properties_.JK_AAR_Armature_Props,
     # operators...
     _operators_.JK_OT_Bake_Retarget_Actions, 
     _operators_.JK_OT_Add_Action_Slot, 
     _operators_.JK_OT_Remove_Action_Slot,
     _operators_.JK_OT_Edit_Binding,
+    _operators_.JK_OT_Export_Binding,
+    _operators_.JK_OT_Import_Binding,
+    _operators_.JK_OT_Auto_Bind,
     _operators_.JK_OT_Auto_Offset,
     # interface...
     _interface_.JK_AAR_Addon_Prefs,
@@ -69,13 +73,55 @@ def register():
     print("Classes registered...")   
     # register the armature type properties...
     bpy.types.Armature.AAR = bpy.props.PointerProperty(type=_properties_.JK_AAR_Armature_Props)
+    # and the action ones...
+    bpy.types.Action.AAR = bpy.props.PointerProperty(type=_properties_.JK_AAR_Action_Props)
     print("Properties assigned...")
+    # keep the action compatibility index up to date...
+    if _functions_.Action_Index_Update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_functions_.Action_Index_Update)
+    # and play back any retarget previews...
+    if _functions_.Preview_Frame_Update not in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.append(_functions_.Preview_Frame_Update)
+    # end them before a save or load... (their caches don't get saved)
+    for handlers in [bpy.app.handlers.save_pre, bpy.app.handlers.load_pre]:
+        if _functions_.Preview_Save_Update not in handlers:
+            handlers.append(_functions_.Preview_Save_Update)
+    # and clean up any that undo, redo or a load left without a cache...
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _functions_.Preview_Load_Update not in handlers:
+            handlers.append(_functions_.Preview_Load_Update)
+    # the fcurve index can't be trusted after them either...
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update not in handlers:
+            handlers.append(_channels_.Channel_Index_Update)
+    print("Handlers appended...")
 
 def unregister():
     print("UNREGISTER: ['B.L.E.N.D - Armature Active Retargeting']")
+    # end any retarget previews while the properties they need are still around...
+    if bpy.app.timers.is_registered(_functions_.Fill_Retarget_Previews):
+        bpy.app.timers.unregister(_functions_.Fill_Retarget_Previews)
+    _functions_.Clear_Retarget_Previews()
     for cls in reversed(JK_AAR_classes):
         unregister_class(cls)
     print("Classes unregistered...")   
     del bpy.types.Armature.AAR
+    del bpy.types.Action.AAR
     print("Properties deleted...")
+    if _functions_.Action_Index_Update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_functions_.Action_Index_Update)
+    _functions_.Clear_Action_Index()
+    if _functions_.Preview_Frame_Update in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(_functions_.Preview_Frame_Update)
+    for handlers in [bpy.app.handlers.save_pre, bpy.app.handlers.load_pre]:
+        if _functions_.Preview_Save_Update in handlers:
+            handlers.remove(_functions_.Preview_Save_Update)
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _functions_.Preview_Load_Update in handlers:
+            handlers.remove(_functions_.Preview_Load_Update)
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update in handlers:
+            handlers.remove(_channels_.Channel_Index_Update)
+    _channels_.Clear_Channel_Index()
+    print("Handlers removed...")
     
\ No newline at end of file
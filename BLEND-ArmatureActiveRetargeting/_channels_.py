@@ -0,0 +1,60 @@
+import re
+
+from bpy.app.handlers import persistent
+
+# this module is shared by Action Rotation Mode, Switch Transform Space and Armature Active Retargeting, each of them installs on its own so can't import another's copy...
+# keep the copies identical and copy any change to all of them...
+
+# matches pose bone data paths, capturing the (escaped) bone name and the property...
+Bone_path = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]\.(\w+)$')
+
+# channel indices by action pointer, each stored alongside the fcurve count it was built from...
+Channel_indices = {}
+
+def Get_Channel_Key(data_path):
+    # pose bone paths give us the bone name and transform kind...
+    match = Bone_path.match(data_path)
+    if match:
+        return match.group(1).replace('\\"', '"').replace('\\\\', '\\'), match.group(2)
+    # object transform paths are just the kind with no bone name...
+    elif data_path.isidentifier():
+        return "", data_path
+    # anything else isn't a channel we index...
+    return None
+
+def Get_Channel_Index(action):
+    pointer, count = action.as_pointer(), len(action.fcurves)
+    cached = Channel_indices.get(pointer)
+    # if the action has gained or lost fcurves since we last looked the index needs rebuilding...
+    if cached == None or cached[0] != count:
+        index = {}
+        # which only takes one pass over the fcurves...
+        for fcurve in action.fcurves:
+            key = Get_Channel_Key(fcurve.data_path)
+            if key != None:
+                index[(key[0], key[1], fcurve.array_index)] = fcurve
+        cached = Channel_indices[pointer] = (count, index)
+    return cached[1]
+
+def Get_Channel_Curves(action, name, kind):
+    # get the fcurves of one bones (or the objects) transform kind by their array index...
+    index = Get_Channel_Index(action)
+    curves = {i : index[(name, kind, i)] for i in range(4) if (name, kind, i) in index}
+    # if any of them aren't the channel they were indexed as anymore the index is stale and gets rebuilt... (fcurves swapped without the count changing)
+    if any(Get_Channel_Key(fcurve.data_path) != (name, kind) or fcurve.array_index != i for i, fcurve in curves.items()):
+        Clear_Channel_Index(action)
+        index = Get_Channel_Index(action)
+        curves = {i : index[(name, kind, i)] for i in range(4) if (name, kind, i) in index}
+    return curves
+
+def Clear_Channel_Index(action=None):
+    # anything that removes and re-adds fcurves should clear the index, the count alone won't catch that...
+    if action == None:
+        Channel_indices.clear()
+    elif action.as_pointer() in Channel_indices:
+        del Channel_indices[action.as_pointer()]
+
+@persistent
+def Channel_Index_Update(dummy):
+    # loading, undo and redo can free or replace any action, so nothing in the index can be trusted after them...
+    Channel_indices.clear()
@@ -0,0 +1,105 @@
+# Contributor(s): James Goldsworthy (Jim Kroovy)
+
+# This code is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+##### NOTES #####
+
+# Gets run inside a background Blender by Run_Retarget_Farm... (blender -b farm.blend --python _farm_.py -- --spec spec_0.json --result spec_0_result.json)
+#
+# The spec names the source and target armatures and holds this workers share of the offset/action pairs to bake...
+# (the file is a copy saved while bound, so the binding is already in it)
+#
+# {"source" : "Mannequin", "target" : "Mocap", "output" : "baked_0.blend",
+#     "jobs" : [{"offset" : "Mannequin_OFFSET_0", "action" : "Walk", "step" : 1, "bones" : null, "name" : "Mannequin_OFFSET_0_Walk", "hash" : "..."}]}
+#
+# Only the baked actions get written to the output file, the main file appends them from there. (any jobs that fail get marked as failed and the rest still get written)
+#
+# The batch runner borrows Get_Addon from here to load its add-ons, so this only runs main when it's the script Blender was given.
+
+import bpy
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import traceback
+
+# this script lives in the add-on folder...
+Addon_path = os.path.dirname(os.path.abspath(__file__))
+
+def Get_Arguments():
+    # blender keeps its own arguments before the "--"...
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Bake a share of a retarget farm on the open .blend file")
+    parser.add_argument("--spec", required=True, help="The json file of jobs to bake")
+    parser.add_argument("--result", required=True, help="Where to write the json result")
+    return parser.parse_args(argv)
+
+def Get_Addon(path=Addon_path):
+    # the add-on in the folder at the path, (this one if we aren't told otherwise)
+    name = os.path.basename(path)
+    # if the add-on is enabled just use it...
+    if name in bpy.context.preferences.addons and name in sys.modules:
+        return sys.modules[name]
+    # otherwise import it from its folder and register it ourselves... (just the once)
+    if os.path.dirname(path) not in sys.path:
+        sys.path.append(os.path.dirname(path))
+    module = importlib.import_module(name)
+    if not getattr(module, "JK_batch_registered", False):
+        module.register()
+        module.JK_batch_registered = True
+    return module
+
+def main():
+    args = Get_Arguments()
+    with open(args.spec) as file:
+        spec = json.load(file)
+    result, start, baked = {'jobs' : [], 'baked' : spec['output']}, time.perf_counter(), set()
+    try:
+        addon = Get_Addon()
+        source, target = bpy.data.objects[spec['source']], bpy.data.objects[spec['target']]
+    # if we can't even get the add-on or the armatures none of the jobs can run...
+    except Exception:
+        result['error'] = traceback.format_exc()
+        result['jobs'] = [{'name' : job['name'], 'frames' : 0, 'seconds' : 0.0, 'failed' : True} for job in spec['jobs']]
+    else:
+        for job in spec['jobs']:
+            job_start = time.perf_counter()
+            # one job going wrong shouldn't throw away everything else this worker bakes...
+            try:
+                action = bpy.data.actions[job['action']]
+                # bake into a copy of the offset and name it so the main file knows what to append...
+                bake = addon._functions_.Bake_Retarget_Action(source, target, action, step=job.get('step', 1), bones=job.get('bones'),
+                    offset=bpy.data.actions[job['offset']])
+                bake.name = job['name']
+                # tagged with what it was baked from so the main file can tell when it's out of date...
+                addon._functions_.Set_Baked_Action(bake, bpy.data.actions[job['offset']], action, job.get('hash', ""))
+                baked.add(bake)
+                frames = len(range(int(action.frame_range[0]), int(action.frame_range[1]) + 1, job.get('step', 1)))
+                result['jobs'].append({'name' : bake.name, 'frames' : frames, 'seconds' : time.perf_counter() - job_start})
+            except Exception:
+                result['jobs'].append({'name' : job['name'], 'frames' : 0, 'seconds' : time.perf_counter() - job_start, 'failed' : True, 
+                    'error' : traceback.format_exc()})
+    # then always write out whatever did get baked...
+    try:
+        bpy.data.libraries.write(spec['output'], baked, fake_user=True)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['blender_seconds'] = time.perf_counter() - start
+    with open(args.result, 'w') as file:
+        json.dump(result, file, indent=4, default=str)
+
+if __name__ == "__main__":
+    main()
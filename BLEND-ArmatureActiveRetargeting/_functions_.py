@@ -1,16 +1,30 @@
+import re
 import bpy
+import os
+import sys
+import json
+import time
+import numpy
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import concurrent.futures
 
-def Get_Is_Pole(source, sb_name):
-    is_pole = False
-    for p_bone in [pb for pb in source.pose.bones if any(c.type == 'IK' for c in pb.constraints)]:
-        if not is_pole:
-            for con in [con for con in p_bone.constraints if con.type == 'IK' and con.pole_target != None]:
-                if con.pole_subtarget == sb_name:
-                    is_pole = True
-                    break
-        else:
-            break
-    return is_pole
+from bpy.app.handlers import persistent
+
+from . import (_kernels_, _channels_, _poses_)
+
+# matches the (escaped) bone name at the start of any pose bone data path...
+Bone_name = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]')
+
+# the bone names keyed in each action and the bone names of each armature by pointer, stored alongside the count and name they were built from...
+Action_bones, Armature_bones = {}, {}
+
+def Get_Pole_Names(source):
+    # the names of bones used as IK pole targets, in one pass over the constraints...
+    # (worked out fresh at the start of every bind and passed down, constraints can change between binds)
+    return {con.pole_subtarget for pb in source.pose.bones for con in pb.constraints if con.type == 'IK' and con.pole_target != None}
 
 def Add_Retarget_Bones(source, names):
     last_mode, AAR = source.mode, source.data.AAR
@@ -18,19 +32,42 @@ def Add_Retarget_Bones(source, names):
     if len(sb_names) > 0:
         # go into edit mode and...
         bpy.ops.object.mode_set(mode='EDIT')
+        e_bones = source.data.edit_bones
+        # create a duplicate of every source bone...
         for sb_name in sb_names:
-            # create a duplicate of the source bone...
-            se_bone = source.data.edit_bones[sb_name]
-            re_bone = source.data.edit_bones.new("RB_" + sb_name)
-            re_bone.head, re_bone.tail, re_bone.roll = se_bone.head, se_bone.tail, se_bone.roll
+            e_bones.new("RB_" + sb_name)
+        # copy all their heads, tails and rolls across in one go...
+        indices = {e_bone.name : i for i, e_bone in enumerate(e_bones)}
+        s_indices, r_indices = [indices[n] for n in sb_names], [indices["RB_" + n] for n in sb_names]
+        heads, tails, rolls = numpy.empty(len(e_bones) * 3, dtype=numpy.float32), numpy.empty(len(e_bones) * 3, dtype=numpy.float32), numpy.empty(len(e_bones), dtype=numpy.float32)
+        e_bones.foreach_get('head', heads)
+        e_bones.foreach_get('tail', tails)
+        e_bones.foreach_get('roll', rolls)
+        heads, tails = heads.reshape(-1, 3), tails.reshape(-1, 3)
+        heads[r_indices], tails[r_indices], rolls[r_indices] = heads[s_indices], tails[s_indices], rolls[s_indices]
+        e_bones.foreach_set('head', heads.ravel())
+        e_bones.foreach_set('tail', tails.ravel())
+        e_bones.foreach_set('roll', rolls)
+        # then their settings and parents...
+        for sb_name in sb_names:
+            se_bone, re_bone = e_bones[sb_name], e_bones["RB_" + sb_name]
             re_bone.use_local_location, re_bone.use_connect = se_bone.use_local_location, se_bone.use_connect
             re_bone.use_inherit_rotation, re_bone.inherit_scale = se_bone.use_inherit_rotation, se_bone.inherit_scale
             re_bone.parent, re_bone.use_deform = se_bone.parent, False
             AAR.Pose_bones[sb_name].Retarget = "RB_" + sb_name
     if source.mode != last_mode:
         bpy.ops.object.mode_set(mode=last_mode)
+    # hide all the retarget bones, writing the flags straight into the properties so their updates don't fire once per bone...
     for pb in AAR.Pose_bones:
-        pb.Hide_retarget = True
+        pb["Hide_retarget"] = True
+        Set_Binding_Hidden(source, None, pb)
+
+def Set_Binding_Hidden(source, target, pb):
+    # hide or show the bones of a pose bones binding, (what its hide updates do)
+    if target != None and pb.Target in target.data.bones:
+        target.data.bones[pb.Target].hide = pb.Hide_target
+    if pb.Retarget in source.data.bones:
+        source.data.bones[pb.Retarget].hide = pb.Hide_retarget
 
 def Remove_Retarget_Bones(source, names):
     last_mode = source.mode
@@ -43,8 +80,9 @@ def Remove_Retarget_Bones(source, names):
     if source.mode != last_mode:
         bpy.ops.object.mode_set(mode=last_mode)
 
-def Bind_Pose_Bone(source, target, sb_name, tb_name):
-    prefs = bpy.context.preferences.addons["BLEND-ArmatureActiveRetargeting"].preferences
+def Bind_Pose_Bone(source, target, sb_name, tb_name, prefs=None, poles=None):
+    prefs = prefs if prefs != None else bpy.context.preferences.addons["BLEND-ArmatureActiveRetargeting"].preferences
+    poles = poles if poles != None else Get_Pole_Names(source)
     rb_name = "RB_" + sb_name
     # then into pose mode...
     if source.mode != 'POSE':    
@@ -52,7 +90,7 @@ def Bind_Pose_Bone(source, target, sb_name, tb_name):
     # to bind the bones together...
     sp_bone, rp_bone = source.pose.bones[sb_name], source.pose.bones[rb_name]
     # if the source bone is a pole target...
-    if Get_Is_Pole(source, sb_name):
+    if sb_name in poles:
         # add an inverted child of constraint to the retarget bone...
         child_of = rp_bone.constraints.new('CHILD_OF')
         child_of.name, child_of.show_expanded = "RETARGET - Child Of", False
@@ -95,7 +133,25 @@ def Bind_Pose_Bone(source, target, sb_name, tb_name):
     else:    
         pb = source.data.AAR.Pose_bones.add()
     pb.name, pb.Retarget = sb_name, rb_name
-    pb.Is_bound, pb.Hide_target, pb.Hide_retarget = True, True, True
+    pb.Is_bound = True
+    # (without firing the hide updates for each of them)
+    pb["Hide_target"], pb["Hide_retarget"] = True, True
+    Set_Binding_Hidden(source, target, pb)
+
+def Bind_Pose_Bones(source, target, mapping):
+    # bind a whole mapping of source to target bone names in one pass...
+    # (the targets get written straight into the property so their updates don't unbind and rebind every bone one at a time)
+    AAR, prefs = source.data.AAR, bpy.context.preferences.addons["BLEND-ArmatureActiveRetargeting"].preferences
+    poles = Get_Pole_Names(source)
+    if source.mode != 'POSE':
+        bpy.ops.object.mode_set(mode='POSE')
+    for sb_name, tb_name in mapping.items():
+        pb = AAR.Pose_bones[sb_name]
+        if pb.Is_bound:
+            Unbind_Pose_Bone(source, sb_name, pb.Retarget)
+        if tb_name != "" and target != None and tb_name in target.data.bones:
+            Bind_Pose_Bone(source, target, sb_name, tb_name, prefs=prefs, poles=poles)
+        pb["Target"] = tb_name
 
 def Rebind_Pose_Bone(source, target, sb_name, tb_name):
     Unbind_Pose_Bone(source, sb_name, "RB_" + sb_name)
@@ -159,63 +215,736 @@ def Get_Bone_Curves(source):
             for pb in source.pose.bones}
     return bone_curves
 
+# the binding constraints on source bones by the binding key their settings get saved under...
+Copy_constraints = [('Copy_loc', "RETARGET - Copy Location"), ('Copy_rot', "RETARGET - Copy Rotation"), ('Copy_sca', "RETARGET - Copy Scale")]
+
+def Get_Binding_Data(source):
+    # the current binding of every pose bone as plain data, its target and copy constraint settings...
+    data = {}
+    for pb in source.data.AAR.Pose_bones:
+        bb = data[pb.name] = {'Target' : pb.Target}
+        if pb.Target != "" and pb.name in source.pose.bones:
+            p_bone = source.pose.bones[pb.name]
+            for key, con_name in Copy_constraints:
+                con = p_bone.constraints.get(con_name)
+                if con != None:
+                    bb[key] = {'Use' : [con.use_x, con.use_y, con.use_z], 'Influence' : con.influence, 'Mute' : con.mute}
+    return data
+
 def Get_Binding(source, binding):
-    AAR = source.data.AAR
-    # clear its old data... (if any)
+    # save the whole binding packed into one json blob... (clearing any bone entries it was saved with before blobs)
     binding.Bindings.clear()
-    # for each of our pose bones...
-    for pb in AAR.Pose_bones:
-        # add a binding...
-        bb = binding.Bindings.add()
-        # save the name and target...
-        bb.name, bb.Target, = pb.name, pb.Target
-        if pb.Target != "":
-            p_bone = source.pose.bones[pb.name]
-            # save the copy location settings...
-            copy_loc = p_bone.constraints["RETARGET - Copy Location"]
-            bb.Copy_loc.Use = [copy_loc.use_x, copy_loc.use_y, copy_loc.use_z]
-            bb.Copy_loc.Influence, bb.Copy_loc.Mute = copy_loc.influence, copy_loc.mute
-            # save the copy rotation settings...
-            copy_rot = p_bone.constraints["RETARGET - Copy Rotation"]
-            bb.Copy_rot.Use = [copy_rot.use_x, copy_rot.use_y, copy_rot.use_z]
-            bb.Copy_rot.Influence, bb.Copy_rot.Mute = copy_rot.influence, copy_rot.mute
-            # save the copy scale settings...
-            copy_sca = p_bone.constraints["RETARGET - Copy Scale"]
-            bb.Copy_sca.Use = [copy_sca.use_x, copy_sca.use_y, copy_sca.use_z]
-            bb.Copy_sca.Influence, bb.Copy_sca.Mute = copy_sca.influence, copy_sca.mute
+    binding.Blob = json.dumps(Get_Binding_Data(source), separators=(',', ':'), sort_keys=True)
+
+def Get_Binding_Blob_Data(binding):
+    # unpack a bindings blob, or read its bone entries if it was saved before blobs...
+    if binding.Blob != "":
+        return json.loads(binding.Blob)
+    data = {}
+    for bb in binding.Bindings:
+        data[bb.name] = {'Target' : bb.Target}
+        if bb.Target != "":
+            for key, _ in Copy_constraints:
+                settings = getattr(bb, key)
+                data[bb.name][key] = {'Use' : list(settings.Use), 'Influence' : settings.Influence, 'Mute' : settings.Mute}
+    return data
+
+def Set_Constraint_Settings(con, settings):
+    # only write the settings that are different, every write to a constraint tags the armature for an update...
+    if [con.use_x, con.use_y, con.use_z] != list(settings['Use']):
+        con.use_x, con.use_y, con.use_z = settings['Use']
+    if con.influence != settings['Influence']:
+        con.influence = settings['Influence']
+    if con.mute != settings['Mute']:
+        con.mute = settings['Mute']
 
 def Set_Binding(source, binding):
     AAR = source.data.AAR
-    # unbind all the pose bones...
+    # compare what the binding wants with what we currently have...
+    data, current = Get_Binding_Blob_Data(binding), Get_Binding_Data(source)
+    changed, mapping = [], {}
     for pb in AAR.Pose_bones:
-        Unbind_Pose_Bone(source, pb.name, pb.Retarget)
-    # then rebind them all...
-    for pb in AAR.Pose_bones:   
-        # if its name is in the binding...
-        if pb.name in binding.Bindings:
-            # get the binding bone entry...
-            bb = binding.Bindings[pb.name]
-            pb.Target = bb.Target
-            # get the pose bone...
+        # (bones that aren't in the binding don't have a target)
+        bb = data.get(pb.name, {'Target' : ""})
+        target = bb['Target']
+        # bones that already match don't get touched at all...
+        if current.get(pb.name) == bb and (target == "" or pb.Is_bound):
+            continue
+        changed.append((pb, bb))
+        # only bones whose target has changed get rebound...
+        if pb.Target != target or (target != "" and not pb.Is_bound):
+            mapping[pb.name] = target
+    # all in one go, so the pole targets only get worked out once...
+    if mapping:
+        Bind_Pose_Bones(source, AAR.Target, mapping)
+    for pb, bb in changed:
+        target = bb['Target']
+        # if the target is not nothing...
+        if target != "" and pb.Is_bound:
+            # load any copy location, rotation and scale settings that are different...
             p_bone = source.pose.bones[pb.name]
-            #Bind_Pose_Bone(source, AAR.Target, sb_name, tb_name)
-            # if the target is not nothing...
-            if pb.Target != "":
-                # load the copy location settings...
-                copy_loc = p_bone.constraints["RETARGET - Copy Location"]
-                copy_loc.use_x, copy_loc.use_y, copy_loc.use_z = bb.Copy_loc.Use[:] 
-                copy_loc.influence, copy_loc.mute = bb.Copy_loc.Influence, bb.Copy_loc.Mute
-                # save the copy rotation settings...
-                copy_rot = p_bone.constraints["RETARGET - Copy Rotation"]
-                copy_rot.use_x, copy_rot.use_y, copy_rot.use_z = bb.Copy_rot.Use[:]
-                copy_rot.influence, copy_rot.mute = bb.Copy_rot.Influence, bb.Copy_rot.Mute
-                # load the copy scale settings...
-                copy_sca = p_bone.constraints["RETARGET - Copy Scale"]
-                copy_sca.use_x, copy_sca.use_y, copy_sca.use_z = bb.Copy_sca.Use[:]
-                copy_sca.influence, copy_sca.mute = bb.Copy_sca.Influence, bb.Copy_sca.Mute
-                pb.Is_bound = True
-        pb.Is_bound = False
+            for key, con_name in Copy_constraints:
+                con = p_bone.constraints.get(con_name)
+                if con != None and key in bb:
+                    Set_Constraint_Settings(con, bb[key])
+
+def Write_Binding_File(binding, filepath):
+    with open(filepath, 'w') as file:
+        json.dump({'name' : binding.name, 'bones' : Get_Binding_Blob_Data(binding)}, file, indent=4, sort_keys=True)
+
+def Read_Binding_File(source, filepath):
+    with open(filepath) as file:
+        data = json.load(file)
+    # the binding gets named from the file if it doesn't say what it's called...
+    AAR, name = source.data.AAR, data.get('name') or os.path.splitext(os.path.basename(filepath))[0]
+    binding = AAR.Bindings[name] if name in AAR.Bindings else AAR.Bindings.add()
+    binding.name, binding.Blob = name, json.dumps(data['bones'], separators=(',', ':'), sort_keys=True)
+    binding.Bindings.clear()
+    return binding
+
+Side_names = {'l' : 'L', 'left' : 'L', 'r' : 'R', 'right' : 'R'}
+
+def Get_Name_Tokens(name):
+    # split a bone name into lowercase words and numbers, (camel case, underscores, dots, colons and spaces all split it)
+    return [token.lower() for token in re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', name)]
+
+def Get_Mapping_Words():
+    # the naming tables of the bone mapping add-on as sets of lowercase words, from its preferences if it's enabled... (or its default mapping if it's loaded)
+    addon, entries = bpy.context.preferences.addons.get("BLEND-ArmatureBoneMapping"), []
+    mapping = getattr(addon.preferences, "Mapping", None) if addon else None
+    if mapping:
+        for part in mapping:
+            for joint in part.Joints:
+                for section in joint.Sections:
+                    entries.append([part.Part, part.First, joint.Joint, joint.First, section.Section, section.First])
+    elif "BLEND-ArmatureBoneMapping" in sys.modules and hasattr(sys.modules["BLEND-ArmatureBoneMapping"], "_properties_"):
+        for part, joints in sys.modules["BLEND-ArmatureBoneMapping"]._properties_.Default_mapping.items():
+            for joint, sections in joints.items():
+                for section in sections:
+                    entries.append([part[0], part[1], joint[0], joint[1], section[0], section[1]])
+    # (sides aren't part of what a bone is, they get matched separately)
+    return [frozenset(token for word in entry for token in Get_Name_Tokens(word)) - set(Side_names) for entry in entries]
+
+def Get_Name_Features(names, entries):
+    # the words, side and best naming table entry of each bone name...
+    tokens = [Get_Name_Tokens(name) for name in names]
+    # words that nearly every bone shares are prefixes, (like "mixamorig" or "def") so they tell us nothing...
+    counts = {}
+    for words in tokens:
+        for word in set(words):
+            counts[word] = counts.get(word, 0) + 1
+    common = {word for word, count in counts.items() if len(names) > 2 and count > len(names) * 0.5}
+    features = []
+    for words in tokens:
+        sides = [Side_names[word] for word in words if word in Side_names]
+        words = frozenset(word for word in words if word not in Side_names and word not in common)
+        # the naming table entry covering most of its words, if any entry covers at least half...
+        best, key = 0.5, None
+        for i, entry in enumerate(entries):
+            if entry:
+                score = len(words & entry) / len(entry)
+                if score > best or (score == best and key != None and len(entry) > len(entries[key])):
+                    best, key = score, i
+        features.append((words, sides[-1] if sides else "", key))
+    return features
+
+def Get_Name_Costs(s_names, t_names):
+    # how different every source name is from every target name, from 0.0 (the same) to 1.0... (plus 1.0 if they are on different sides)
+    entries = Get_Mapping_Words()
+    s_features, t_features = Get_Name_Features(s_names, entries), Get_Name_Features(t_names, entries)
+    costs = numpy.ones((len(s_names), len(t_names)))
+    for i, (s_words, s_side, s_key) in enumerate(s_features):
+        for j, (t_words, t_side, t_key) in enumerate(t_features):
+            if s_key != None and s_key == t_key:
+                similarity = 1.0
+            else:
+                union = len(s_words | t_words)
+                similarity = len(s_words & t_words) / union if union else 0.0
+            costs[i, j] = 1.0 - similarity + (1.0 if s_side != t_side else 0.0)
+    return costs
+
+def Get_Bone_Positions(armature, names):
+    # world space rest heads and tails fitted into a unit box, (so armatures of different sizes and placements can be compared) and hierarchy depths from 0.0 to 1.0...
+    bones = armature.data.bones
+    world = numpy.array(armature.matrix_world)
+    points = numpy.array([[bones[name].head_local[:] + (1.0,), bones[name].tail_local[:] + (1.0,)] for name in names]).reshape(len(names), 2, 4)
+    points = (points @ world.T)[:, :, :3]
+    low, size = points.reshape(-1, 3).min(axis=0), numpy.ptp(points.reshape(-1, 3), axis=0).max()
+    points = (points - low) / (size if size > 0.0 else 1.0)
+    indices = {bone.name : i for i, bone in enumerate(bones)}
+    depths = _poses_.Get_Bone_Depths(numpy.array([indices[bone.parent.name] if bone.parent else -1 for bone in bones], dtype=int))
+    depths = depths[[indices[name] for name in names]].astype(float)
+    return points, depths / (depths.max() if len(depths) and depths.max() > 0 else 1.0)
+
+def Get_Assignment(costs):
+    # the cheapest way to give every row its own column, (rows must not outnumber columns) solved with the hungarian method one row at a time...
+    rows, columns = costs.shape
+    u, v = numpy.zeros(rows + 1), numpy.zeros(columns + 1)
+    owners, ways = numpy.zeros(columns + 1, dtype=int), numpy.zeros(columns + 1, dtype=int)
+    for row in range(1, rows + 1):
+        owners[0], column = row, 0
+        slack, used = numpy.full(columns + 1, numpy.inf), numpy.zeros(columns + 1, dtype=bool)
+        # grow an alternating path from the row until it reaches a free column...
+        while True:
+            used[column] = True
+            reduced = costs[owners[column] - 1] - u[owners[column]] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < slack[1:])
+            slack[1:][better], ways[1:][better] = reduced[better], column
+            candidates = numpy.flatnonzero(free)
+            nearest = candidates[numpy.argmin(slack[1:][candidates])] + 1
+            delta = slack[nearest]
+            u[owners[used]] += delta
+            v[used] -= delta
+            slack[1:][free] -= delta
+            column = nearest
+            if owners[column] == 0:
+                break
+        # then flip the path so the row gets its column...
+        while column != 0:
+            previous = ways[column]
+            owners[column] = owners[previous]
+            column = previous
+    return {owners[column] - 1 : column - 1 for column in range(1, columns + 1) if owners[column] != 0}
+
+def Get_Bone_Correspondence(source, target, names, t_names=None, name_weight=1.0, hierarchy_weight=0.5, proximity_weight=1.0, threshold=1.0):
+    # propose a target bone for every named source bone at once, scored on names, hierarchy and rest positions... (bones costing more than the threshold stay unmatched)
+    t_names = t_names if t_names != None else [bone.name for bone in target.data.bones]
+    if not names or not t_names:
+        return {name : "" for name in names}
+    s_points, s_depths = Get_Bone_Positions(source, names)
+    t_points, t_depths = Get_Bone_Positions(target, t_names)
+    distances = numpy.sqrt(((s_points[:, None] - t_points[None, :]) ** 2).sum(axis=3)).mean(axis=2)
+    costs = (name_weight * Get_Name_Costs(names, t_names) + hierarchy_weight * numpy.abs(s_depths[:, None] - t_depths[None, :]) 
+        + proximity_weight * distances)
+    # every source bone also gets its own "no match" column that costs the threshold...
+    unmatched = numpy.full((len(names), len(names)), numpy.inf)
+    numpy.fill_diagonal(unmatched, threshold)
+    assignment = Get_Assignment(numpy.hstack((costs, unmatched)))
+    return {name : t_names[assignment[i]] if assignment.get(i, len(t_names)) < len(t_names) else "" for i, name in enumerate(names)}
+
+def Get_Action_Bones(action):
+    pointer, count = action.as_pointer(), len(action.fcurves)
+    cached = Action_bones.get(pointer)
+    # if the action has gained or lost fcurves since we last looked it needs re-indexing... (or if it's a different action that got the same pointer)
+    if cached == None or cached[0] != count or cached[1] != action.name:
+        names = set()
+        for fcurve in action.fcurves:
+            match = Bone_name.match(fcurve.data_path)
+            if match:
+                names.add(match.group(1).replace('\\"', '"').replace('\\\\', '\\'))
+        cached = Action_bones[pointer] = (count, action.name, frozenset(names))
+    return cached[2]
+
+def Get_Armature_Bones(armature):
+    pointer, count = armature.data.as_pointer(), len(armature.data.bones)
+    cached = Armature_bones.get(pointer)
+    if cached == None or cached[0] != count or cached[1] != armature.data.name:
+        cached = Armature_bones[pointer] = (count, armature.data.name, frozenset(bone.name for bone in armature.data.bones))
+    return cached[2]
+
+def Get_Is_Compatible(armature, action):
+    # an action is compatible with an armature if it animates any of its bones...
+    return not Get_Action_Bones(action).isdisjoint(Get_Armature_Bones(armature))
+
+def Get_Compatible_Actions(armature):
+    # while we're going over every action anyway, forget any that have been removed...
+    pointers = {action.as_pointer() for action in bpy.data.actions}
+    for pointer in [pointer for pointer in Action_bones if pointer not in pointers]:
+        del Action_bones[pointer]
+    return [action for action in bpy.data.actions if Get_Is_Compatible(armature, action)]
+
+def Clear_Action_Index():
+    Action_bones.clear()
+    Armature_bones.clear()
+
+@persistent
+def Action_Index_Update(scene, depsgraph):
+    # any actions or armatures that changed get re-indexed the next time they are asked about... (fcurve data paths and bone names can change without their counts changing)
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Action):
+            Action_bones.pop(update.id.original.as_pointer(), None)
+        elif isinstance(update.id, bpy.types.Armature):
+            Armature_bones.pop(update.id.original.as_pointer(), None)
 
 def Action_Poll(self, action):
-    actions = [a for a in bpy.data.actions if any(b.name in fc.data_path for b in self.Armature.data.bones for fc in a.fcurves)]
-    return action in actions
\ No newline at end of file
+    return self.Armature != None and Get_Is_Compatible(self.Armature, action)
+
+def Get_Basis_Samples(action, p_bone, frames):
+    # a pose bones basis matrices over the frames from the action, (or its current basis on every frame if there's no action)
+    if action:
+        return _poses_.Get_Transform_Samples(action, p_bone, p_bone.name, frames)
+    return numpy.broadcast_to(numpy.array(p_bone.matrix_basis), (len(frames), 4, 4)).copy()
+
+def Get_Copy_Settings(p_bone, con_name):
+    # the axes and influence of one of the binding constraints, a muted or missing constraint just has no influence...
+    con = p_bone.constraints.get(con_name)
+    if con == None or con.mute:
+        return [False, False, False], 0.0
+    return [con.use_x, con.use_y, con.use_z], con.influence
+
+def Get_Bake_Export(source, target, offset, frames):
+    # export the sources hierarchy and its binding into flat arrays, (retarget bones get left out, we work out where they would be ourselves)
+    AAR = source.data.AAR
+    retargets = {pb.Retarget for pb in AAR.Pose_bones if pb.Retarget}
+    bones = [bone for bone in source.data.bones if bone.name not in retargets]
+    indices = {bone.name : i for i, bone in enumerate(bones)}
+    t_indices = {p_bone.name : i for i, p_bone in enumerate(target.pose.bones)}
+    bound = [pb for pb in AAR.Pose_bones if pb.Is_bound and pb.name in indices and pb.Target in t_indices and pb.Retarget in source.pose.bones]
+    export = {'names' : [bone.name for bone in bones], 'indices' : indices, 'world' : numpy.array(source.matrix_world),
+        'parents' : numpy.array([indices.get(bone.parent.name, -1) if bone.parent else -1 for bone in bones], dtype=int),
+        'rests' : numpy.array([numpy.array(bone.matrix_local) for bone in bones]).reshape(len(bones), 4, 4),
+        'bases' : numpy.stack([Get_Basis_Samples(offset, source.pose.bones[bone.name], frames) for bone in bones], axis=1) 
+            if bones else numpy.empty((len(frames), 0, 4, 4)),
+        'inherits' : _poses_.Get_Inherit_Flags(bones), 'bound' : numpy.array([indices[pb.name] for pb in bound], dtype=int), 
+        'targets' : numpy.array([t_indices[pb.Target] for pb in bound], dtype=int)}
+    # pole targets follow their target bone through an inverted child of on the retarget bone... (so we need its inverse and the retarget bones own basis)
+    poles, inverses, retargets = [], [], []
+    uses, influences, orders, powers = [[], [], []], [[], [], []], [], []
+    for pb in bound:
+        sp_bone, rp_bone = source.pose.bones[pb.name], source.pose.bones[pb.Retarget]
+        child_of = rp_bone.constraints.get("RETARGET - Child Of")
+        poles.append(child_of != None)
+        inverses.append(numpy.array(child_of.inverse_matrix) if child_of else numpy.identity(4))
+        retargets.append(Get_Basis_Samples(offset, rp_bone, frames) if child_of else numpy.broadcast_to(numpy.identity(4), (len(frames), 4, 4)))
+        for i, con_name in enumerate(["RETARGET - Copy Location", "RETARGET - Copy Rotation", "RETARGET - Copy Scale"]):
+            use, influence = Get_Copy_Settings(sp_bone, con_name)
+            uses[i].append(use), influences[i].append(influence)
+        # copy rotation zeroes unused axes as eulers in its own order, (auto means the bones order, or XYZ if it doesn't have one)
+        copy_rot, copy_sca = sp_bone.constraints.get("RETARGET - Copy Rotation"), sp_bone.constraints.get("RETARGET - Copy Scale")
+        order = copy_rot.euler_order if copy_rot and copy_rot.euler_order != 'AUTO' else sp_bone.rotation_mode
+        orders.append(order if order not in ['QUATERNION', 'AXIS_ANGLE'] else 'XYZ')
+        powers.append(copy_sca.power if copy_sca else 1.0)
+    export.update({'poles' : numpy.array(poles, dtype=bool), 'inverses' : numpy.array(inverses).reshape(len(bound), 4, 4),
+        'retargets' : numpy.stack(retargets, axis=1) if bound else numpy.empty((len(frames), 0, 4, 4)),
+        'uses' : numpy.array(uses, dtype=bool).reshape(3, len(bound), 3), 'influences' : numpy.array(influences).reshape(3, len(bound)),
+        'orders' : numpy.array(orders, dtype=str), 'powers' : numpy.array(powers)})
+    return export
+
+def Get_Target_Poses(source, target, frames, scene):
+    # step the scene once per frame and read the targets whole world space pose in one go...
+    # (the binding constraints get muted while we do it, we work out what they would do ourselves)
+    cons = [con for p_bone in source.pose.bones for con in p_bone.constraints if con.name.startswith("RETARGET - ") and not con.mute]
+    for con in cons:
+        con.mute = True
+    count = len(target.pose.bones)
+    poses, worlds, flat = numpy.empty((len(frames), count, 4, 4)), numpy.empty((len(frames), 4, 4)), numpy.empty(count * 16, dtype=numpy.float32)
+    # (whatever happens while stepping the scene the binding has to get unmuted)
+    try:
+        for f, frame in enumerate(frames):
+            scene.frame_set(int(frame))
+            # pose bone matrices come out column by column...
+            target.pose.bones.foreach_get('matrix', flat)
+            poses[f] = flat.reshape(count, 4, 4).transpose(0, 2, 1)
+            worlds[f] = numpy.array(target.matrix_world)
+    finally:
+        for con in cons:
+            con.mute = False
+    return worlds[:, None] @ poses
+
+def Get_Copied_Rotations(quats, uses, orders):
+    # copy rotation only copies the axes it uses, the unused ones get zeroed as eulers...
+    quats, partial = quats.copy(), ~uses.all(axis=1)
+    for order in numpy.unique(orders[partial]):
+        rows = partial & (orders == order)
+        eulers = _kernels_.Get_Eulers_From_Quaternions(quats[rows], order)
+        quats[rows] = _kernels_.Get_Quaternions_From_Eulers(numpy.where(uses[rows], eulers, 0.0), order)
+    return quats
+
+def Get_Bound_Locals(export, slots, transforms, bases, targets):
+    # the local matrices of one generation of bound bones on every frame, (transforms are what they get posed by from their parents)
+    frames, count = bases.shape[:2]
+    world = export['world']
+    # the retarget bones copy their target bones world transforms... (or follow them as a child if they are poles)
+    rb_poses = numpy.linalg.inv(world) @ targets[:, export['targets'][slots]]
+    poles = export['poles'][slots]
+    if numpy.any(poles):
+        # (retarget bones share their bones parent, rest and inheritance, so they get posed by the same transforms)
+        rb_own = _poses_.Get_Applied_Transforms([transform[:, poles] for transform in transforms], export['retargets'][:, slots[poles]])
+        rb_poses[:, poles] = rb_poses[:, poles] @ export['inverses'][slots[poles]] @ world @ rb_own
+    rb_locals = _poses_.Get_Applied_Transforms(_poses_.Get_Inverted_Transforms(transforms), rb_poses)
+    own_locs, own_quats, own_scales = _poses_.Get_Transforms_From_Matrices(bases.reshape(-1, 4, 4))
+    rb_locs, rb_quats, rb_scales = _poses_.Get_Transforms_From_Matrices(rb_locals.reshape(-1, 4, 4))
+    # every bones settings repeated for every frame...
+    uses, influences = numpy.tile(export['uses'][:, slots], (1, frames, 1)), numpy.tile(export['influences'][:, slots], (1, frames))
+    orders, powers = numpy.tile(export['orders'][slots], frames), numpy.tile(export['powers'][slots], frames)
+    # copy location adds the retarget bones location onto the bones own... (local space with offset)
+    locs = own_locs + numpy.where(uses[0], rb_locs, 0.0) * influences[0][:, None]
+    # copy rotation puts the retarget bones rotation before the bones own, influence blends between them...
+    rb_quats = Get_Copied_Rotations(rb_quats, uses[1], orders)
+    quats = _poses_.Get_Slerped_Quaternions(own_quats, _poses_.Get_Multiplied_Quaternions(rb_quats, own_quats), influences[1])
+    # and copy scale multiplies the bones own scale by the retarget bones... (raised to the constraints power)
+    copied = own_scales * numpy.where(uses[2], numpy.sign(rb_scales) * numpy.abs(rb_scales) ** powers[:, None], 1.0)
+    scales = own_scales + (copied - own_scales) * influences[2][:, None]
+    return _poses_.Get_Matrices_From_Transforms(locs, quats, scales).reshape(frames, count, 4, 4)
+
+def Get_Retarget_Locals(export, targets):
+    # work down the sources hierarchy one generation at a time, bound bones need their parents final pose before they can be worked out...
+    parents, bases, rests, inherits = export['parents'], export['bases'], export['rests'], export['inherits']
+    offsets, depths = _poses_.Get_Rest_Offsets(rests, parents), _poses_.Get_Bone_Depths(parents)
+    slots = numpy.full(len(parents), -1, dtype=int)
+    slots[export['bound']] = numpy.arange(len(export['bound']))
+    matrices, poses = bases.copy(), numpy.empty_like(bases)
+    for depth in range(depths.max() + 1 if len(depths) else 0):
+        level = numpy.flatnonzero(depths == depth)
+        # bones don't always inherit all of their parents transform, (the same rules Blender uses for local space)
+        transforms = _poses_.Get_Parent_Transforms(offsets[level], rests[parents[level]], poses[:, parents[level]] if depth > 0 else None, 
+            {key : flags[level] for key, flags in inherits.items()}, len(bases))
+        is_bound = slots[level] >= 0
+        if numpy.any(is_bound):
+            matrices[:, level[is_bound]] = Get_Bound_Locals(export, slots[level[is_bound]], [transform[:, is_bound] for transform in transforms], 
+                bases[:, level[is_bound]], targets)
+        poses[:, level] = _poses_.Get_Applied_Transforms(transforms, matrices[:, level])
+    return matrices
+
+def Set_Baked_Curves(action, name, item, frames, matrices):
+    # decompose the matrices and write them into the channels, rotations kept continuous in the items rotation mode...
+    # (removing and re-adding curves isn't caught by the fcurve count, callers clear the channel index once everything is written)
+    locations, quats, scales = _poses_.Get_Transforms_From_Matrices(matrices)
+    rot_mode, rot_path = item.rotation_mode, _poses_.Get_Rotation_Path(item.rotation_mode)
+    rotations = _kernels_.Get_Converted_Rotations(quats, 'QUATERNION', rot_mode, continuous=True)
+    for kind, values in [("location", locations), (rot_path, rotations), ("scale", scales)]:
+        data_path = item.path_from_id(kind)
+        curves = _channels_.Get_Channel_Curves(action, name, kind)
+        for i in range(values.shape[1]):
+            # any old curves in this channel get replaced by the baked ones...
+            if i in curves:
+                action.fcurves.remove(curves[i])
+            fcurve = action.fcurves.new(data_path, index=i, action_group=name)
+            fcurve.keyframe_points.add(len(frames))
+            fcurve.keyframe_points.foreach_set('co', numpy.column_stack((frames, values[:, i])).astype(numpy.float32).ravel())
+            fcurve.update()
+
+def Bake_Retarget_Action(source, target, action, step=1, bones=None, scene=None, offset=None):
+    # a context free bake of the targets action onto the bound source bones, without stepping the bindings constraints...
+    start = time.perf_counter()
+    AAR, scene = source.data.AAR, scene if scene else bpy.context.scene
+    if not target.animation_data:
+        target.animation_data_create()
+    target.animation_data.action = action
+    # the source bones own transforms come from the offset action, (or whatever the source is currently playing)
+    if offset == None and source.animation_data:
+        offset = source.animation_data.action
+    frames = numpy.arange(int(action.frame_range[0]), int(action.frame_range[1]) + 1, step).astype(float)
+    export = Get_Bake_Export(source, target, offset, frames)
+    last_frame = scene.frame_current
+    targets = Get_Target_Poses(source, target, frames, scene)
+    scene.frame_set(last_frame)
+    matrices = Get_Retarget_Locals(export, targets)
+    # bake the bound bones unless we've been told which ones...
+    bound = set(export['bound'].tolist())
+    names = bones if bones != None else [pb.name for pb in AAR.Pose_bones if pb.Is_bound]
+    names = [name for name in names if export['indices'].get(name) in bound]
+    # and key them all into a copy of the offset action... (or a new action named after the targets)
+    baked = offset.copy() if offset else bpy.data.actions.new(action.name)
+    # (a copy shouldn't claim to be a bake of whatever it was copied from)
+    baked.use_fake_user, baked.AAR.Bake_hash = True, ""
+    for name in names:
+        Set_Baked_Curves(baked, name, source.pose.bones[name], frames, matrices[:, export['indices'][name]])
+    _channels_.Clear_Channel_Index(baked)
+    print("Baked " + str(len(names)) + " bones from " + action.name + " over " + str(len(frames)) + " frames in " 
+        + str(round(time.perf_counter() - start, 3)) + " seconds...")
+    return baked
+
+def Set_Curves_Hash(hasher, action):
+    # feed an actions curves into the hash, reading each curves keys in one go...
+    if action == None:
+        hasher.update(b"None")
+        return
+    for fcurve in sorted(action.fcurves, key=lambda fc: (fc.data_path, fc.array_index)):
+        hasher.update((fcurve.data_path + str(fcurve.array_index) + fcurve.extrapolation + str(fcurve.mute) 
+            + str([mod.type for mod in fcurve.modifiers])).encode())
+        keys = fcurve.keyframe_points
+        for prop in ['co', 'handle_left', 'handle_right']:
+            values = numpy.empty(len(keys) * 2, dtype=numpy.float32)
+            keys.foreach_get(prop, values)
+            hasher.update(values.tobytes())
+        interpolations = numpy.empty(len(keys), dtype=numpy.int32)
+        keys.foreach_get('interpolation', interpolations)
+        hasher.update(interpolations.tobytes())
+
+def Get_Bake_Hash(source, offset, action, step, bones):
+    # everything a bake depends on, the target action, the offset, the binding, the step and which bones get baked...
+    hasher = hashlib.sha1()
+    Set_Curves_Hash(hasher, action)
+    Set_Curves_Hash(hasher, offset)
+    hasher.update(json.dumps([Get_Binding_Data(source), step, bones], sort_keys=True).encode())
+    # pole targets also depend on the inverse their child of was set with...
+    for pb in source.data.AAR.Pose_bones:
+        if pb.Retarget in source.pose.bones and "RETARGET - Child Of" in source.pose.bones[pb.Retarget].constraints:
+            hasher.update(numpy.array(source.pose.bones[pb.Retarget].constraints["RETARGET - Child Of"].inverse_matrix, dtype=numpy.float32).tobytes())
+    return hasher.hexdigest()
+
+def Get_Baked_Index():
+    # baked actions by the offset and target action names they were baked from...
+    return {(action.AAR.Offset_name, action.AAR.Target_name) : action for action in bpy.data.actions if action.AAR.Bake_hash}
+
+def Set_Baked_Action(baked, offset, action, digest, stale=None, replace=False):
+    # tag the baked action with what it was baked from...
+    baked.AAR.Offset_name, baked.AAR.Target_name, baked.AAR.Bake_hash = offset.name if offset else "", action.name, digest
+    baked.AAR.Is_offset = False
+    if stale != None and stale != baked:
+        # if it's replacing an out of date bake, take over its users and name... (anything holding on to the old one needs to look it up again by name)
+        if replace:
+            name = stale.name
+            stale.user_remap(baked)
+            bpy.data.actions.remove(stale)
+            baked.name = name
+        # otherwise the old bake stays but it's no longer the bake of this pair...
+        else:
+            stale.AAR.Bake_hash = ""
+
+def Bake_Retarget_Pair(source, offset, action, step, bones, dirty_only=False, index=None):
+    # bake one offset/action pair, unless we only want dirty pairs and this one hasn't changed since it was last baked...
+    index = index if index != None else Get_Baked_Index()
+    digest, stale = Get_Bake_Hash(source, offset, action, step, bones), index.get((offset.name if offset else "", action.name))
+    if dirty_only and stale != None and stale.AAR.Bake_hash == digest:
+        return stale, False
+    baked = Bake_Retarget_Action(source, source.data.AAR.Target, action, step=step, bones=bones, offset=offset)
+    Set_Baked_Action(baked, offset, action, digest, stale=stale, replace=dirty_only)
+    index[(offset.name if offset else "", action.name)] = baked
+    return baked, True
+
+# the script each background Blender runs to bake its share of a farm...
+Farm_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_farm_.py")
+
+def Get_Farm_Jobs(source, dirty_only=False):
+    # every used offset paired with every used action of that offset, the same as an 'ALL' bake... (minus any that are up to date if we only want dirty ones)
+    AAR, jobs, index = source.data.AAR, [], Get_Baked_Index()
+    bones = [pb.name for pb in AAR.Pose_bones if pb.Is_bound and source.data.bones[pb.name].select] if AAR.Only_selected else None
+    for offset in AAR.Offsets:
+        if offset.Use and offset.Action:
+            for offset_action in offset.Actions:
+                if offset_action.Use and offset_action.Action:
+                    digest = Get_Bake_Hash(source, offset.Action, offset_action.Action, offset_action.Bake_step, bones)
+                    stale = index.get((offset.Action.name, offset_action.Action.name))
+                    if dirty_only and stale != None and stale.AAR.Bake_hash == digest:
+                        continue
+                    jobs.append({'offset' : offset.Action.name, 'action' : offset_action.Action.name, 'step' : offset_action.Bake_step, 
+                        'bones' : bones, 'name' : offset.Action.name + "_" + offset_action.Action.name, 'hash' : digest})
+    return jobs
+
+def Write_Farm_Specs(source, folder, workers, dirty_only=False):
+    # save a copy of the file for the workers to open, (the binding comes with it) and write each workers share of the jobs next to it...
+    blend_path = os.path.join(folder, "farm.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+    jobs, specs = Get_Farm_Jobs(source, dirty_only=dirty_only), []
+    # jobs get dealt out round robin so long and short clips end up spread between the workers...
+    for i in range(min(workers, len(jobs))):
+        spec = {'source' : source.name, 'target' : source.data.AAR.Target.name, 
+            'jobs' : jobs[i::workers], 'output' : os.path.join(folder, "baked_" + str(i) + ".blend")}
+        spec_path = os.path.join(folder, "spec_" + str(i) + ".json")
+        with open(spec_path, 'w') as file:
+            json.dump(spec, file, indent=4)
+        specs.append(spec_path)
+    return blend_path, specs
+
+def Run_Farm_Worker(blender, blend_path, spec_path):
+    start = time.perf_counter()
+    result_path = os.path.splitext(spec_path)[0] + "_result.json"
+    command = [blender, "-b", blend_path, "--python", Farm_path, "--", "--spec", spec_path, "--result", result_path]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    try:
+        with open(result_path) as file:
+            result = json.load(file)
+    # if blender fell over before it could write anything there's no result...
+    except (OSError, ValueError):
+        result = {'jobs' : [], 'error' : "No result written by the worker"}
+    result['spec'], result['returncode'], result['seconds'] = spec_path, process.returncode, time.perf_counter() - start
+    if process.returncode != 0 or 'error' in result:
+        result['output'] = process.stdout[-4000:]
+    return result
+
+def Merge_Farm_Results(results, dirty_only=False):
+    # append the baked actions from every workers output file into this one... (replacing any out of date bakes if we only baked dirty ones)
+    merged, index = [], Get_Baked_Index()
+    for result in results:
+        names = [job['name'] for job in result['jobs'] if not job.get('failed')]
+        if names and os.path.exists(result.get('baked', "")):
+            with bpy.data.libraries.load(result['baked']) as (data_from, data_to):
+                data_to.actions = [name for name in data_from.actions if name in names]
+            for action in data_to.actions:
+                if action != None:
+                    action.use_fake_user = True
+                    stale = index.get((action.AAR.Offset_name, action.AAR.Target_name))
+                    if stale != None:
+                        Set_Baked_Action(action, bpy.data.actions.get(action.AAR.Offset_name), bpy.data.actions[action.AAR.Target_name], 
+                            action.AAR.Bake_hash, stale=stale, replace=dirty_only)
+                    index[(action.AAR.Offset_name, action.AAR.Target_name)] = action
+                    merged.append(action.name)
+    return merged
+
+def Run_Retarget_Farm(source, workers=0, blender=None, dirty_only=False):
+    # fan the offset/action pairs out to background Blenders and merge what they bake back into this file...
+    start = time.perf_counter()
+    blender, workers = blender if blender else bpy.app.binary_path, workers if workers > 0 else (os.cpu_count() or 1)
+    folder, results, merged = tempfile.mkdtemp(prefix="aar_farm_"), [], []
+    try:
+        blend_path, specs = Write_Farm_Specs(source, folder, workers, dirty_only=dirty_only)
+        # the heavy lifting happens in the blender processes so threads are all we need to wait on them...
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(specs), 1)) as executor:
+            results = list(executor.map(lambda spec_path: Run_Farm_Worker(blender, blend_path, spec_path), specs))
+        merged = Merge_Farm_Results(results, dirty_only=dirty_only)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    # and sum up how much each worker got through...
+    report = {'workers' : [], 'merged' : merged, 'failed' : sum(1 for result in results if result['returncode'] != 0 or 'error' in result),
+        'failed_jobs' : sum(1 for result in results for job in result['jobs'] if job.get('failed'))}
+    for i, result in enumerate(results):
+        frames, failed = sum(job.get('frames', 0) for job in result['jobs']), [job for job in result['jobs'] if job.get('failed')]
+        rate = frames / result['seconds'] if result['seconds'] > 0.0 else 0.0
+        report['workers'].append({'worker' : i, 'actions' : len(result['jobs']) - len(failed), 'failed' : len(failed), 'frames' : frames, 
+            'seconds' : result['seconds'], 'frames_per_second' : rate, 'error' : result.get('error')})
+        print("Worker " + str(i) + " baked " + str(len(result['jobs']) - len(failed)) + " actions (" + str(frames) + " frames) in " + str(round(result['seconds'], 3)) 
+            + " seconds... (" + str(round(rate, 1)) + " frames per second)")
+        for job in failed:
+            print("Failed to bake " + job['name'] + "...", job.get('error', ""))
+        if result.get('error'):
+            print(result['error'], result.get('output', ""))
+    report['seconds'] = time.perf_counter() - start
+    print("Farmed " + str(len(merged)) + " baked actions across " + str(len(results)) + " workers in " + str(round(report['seconds'], 3)) + " seconds...")
+    return report
+
+# retarget previews by source pointer, each holding the baked local matrices of its bound bones and which frames have been filled...
+Preview_caches = {}
+
+def Get_Preview_Targets(target, action, frames):
+    # the targets world space pose from its action alone, without stepping the scene... (so its own constraints and drivers don't show in a preview)
+    export = _poses_.Get_Pose_Export(target, action, frames)
+    poses = _poses_.Get_Evaluated_Poses(export['rests'], export['parents'], export['bases'], inherits=export['inherits'])
+    indices = {name : i for i, name in enumerate(export['names'])}
+    return export['world'] @ poses[:, [indices[p_bone.name] for p_bone in target.pose.bones]]
+
+def Start_Retarget_Preview(source, chunk=24):
+    AAR = source.data.AAR
+    target = AAR.Target
+    action = target.animation_data.action if target and target.animation_data else None
+    if action == None:
+        print("Target has no action to preview!")
+        return False
+    Stop_Retarget_Preview(source)
+    count = len(source.pose.bones)
+    bases = numpy.empty(count * 16, dtype=numpy.float32)
+    source.pose.bones.foreach_get('matrix_basis', bases)
+    bound = [i for i, p_bone in enumerate(source.pose.bones) if p_bone.name in AAR.Pose_bones and AAR.Pose_bones[p_bone.name].Is_bound]
+    frames = numpy.arange(int(action.frame_range[0]), int(action.frame_range[1]) + 1).astype(float)
+    offset = source.animation_data.action if source.animation_data else None
+    # export the source once while the binding is live and its pose is still its own, the preview is about to start writing into it...
+    export = Get_Bake_Export(source, target, offset, frames)
+    # (the exports bone order isn't the pose bone order)
+    columns = [export['indices'][source.pose.bones[i].name] for i in bound]
+    # mute the binding constraints and take the sources action off it, the preview is going to pose the bones itself...
+    muted = [(p_bone.name, con.name) for p_bone in source.pose.bones for con in p_bone.constraints if con.name.startswith("RETARGET - ") and not con.mute]
+    for b_name, c_name in muted:
+        source.pose.bones[b_name].constraints[c_name].mute = True
+    if offset != None:
+        source.animation_data.action = None
+    Preview_caches[source.as_pointer()] = {'source' : source.name, 'target' : target.name, 'action' : action.name, 'offset' : offset.name if offset else "",
+        'frames' : frames, 'bases' : bases.reshape(count, 4, 4), 'bound' : numpy.array(bound, dtype=int), 'export' : export, 'columns' : columns,
+        'matrices' : numpy.empty((len(frames), len(bound), 4, 4), dtype=numpy.float32), 'filled' : numpy.zeros(len(frames), dtype=bool),
+        'next' : 0, 'chunk' : chunk, 'muted' : muted, 'start' : time.perf_counter()}
+    # the cache won't survive saving, undo or a reload, so what got muted and taken off the source gets kept on the armature too...
+    AAR.Preview_muted, AAR.Preview_offset = json.dumps(muted), offset.name if offset else ""
+    # the cache gets filled a chunk at a time from a timer, so blender stays responsive while it fills...
+    if not bpy.app.timers.is_registered(Fill_Retarget_Previews):
+        bpy.app.timers.register(Fill_Retarget_Previews, first_interval=0.0)
+    return True
+
+def Set_Preview_Chunk(source, cache):
+    # bake the next chunk of frames into the cache, the same way a bake works them out...
+    first = cache['next']
+    frames = cache['frames'][first:first + cache['chunk']]
+    target, action = bpy.data.objects[cache['target']], bpy.data.actions[cache['action']]
+    # only the per frame parts of the export need slicing...
+    export = dict(cache['export'], bases=cache['export']['bases'][first:first + len(frames)], retargets=cache['export']['retargets'][first:first + len(frames)])
+    matrices = Get_Retarget_Locals(export, Get_Preview_Targets(target, action, frames))
+    cache['matrices'][first:first + len(frames)] = matrices[:, cache['columns']]
+    cache['filled'][first:first + len(frames)] = True
+    cache['next'] = first + len(frames)
+    if cache['next'] >= len(cache['frames']):
+        print("Cached a retarget preview of " + cache['action'] + " for " + cache['source'] + " over " + str(len(cache['frames'])) + " frames in " 
+            + str(round(time.perf_counter() - cache['start'], 3)) + " seconds...")
+
+def Get_Preview_Source(pointer, cache):
+    # the source object of a preview, if it still exists... (undo can replace it)
+    source = bpy.data.objects.get(cache['source'])
+    return source if source != None and source.as_pointer() == pointer else None
+
+def Fill_Retarget_Previews():
+    for pointer, cache in list(Preview_caches.items()):
+        source = Get_Preview_Source(pointer, cache)
+        if source == None or cache['target'] not in bpy.data.objects or cache['action'] not in bpy.data.actions:
+            del Preview_caches[pointer]
+        elif cache['next'] < len(cache['frames']):
+            Set_Preview_Chunk(source, cache)
+    # keep ticking while there's anything left to fill...
+    return 0.01 if any(cache['next'] < len(cache['frames']) for cache in Preview_caches.values()) else None
+
+@persistent
+def Preview_Frame_Update(scene, depsgraph=None):
+    # pose the sources of any previews from their caches, (frames that haven't been filled yet just keep the last pose)
+    for pointer, cache in Preview_caches.items():
+        source = Get_Preview_Source(pointer, cache)
+        index = int(round(scene.frame_current - cache['frames'][0])) if len(cache['frames']) else -1
+        if source != None and 0 <= index < len(cache['frames']) and cache['filled'][index]:
+            bases = cache['bases'].copy()
+            bases[cache['bound']] = cache['matrices'][index]
+            # pose bone matrices go in column by column...
+            source.pose.bones.foreach_set('matrix_basis', bases.transpose(0, 2, 1).ravel())
+            # (foreach_set doesn't tag anything for an update itself)
+            source.update_tag()
+
+def Stop_Retarget_Preview(source):
+    AAR = source.data.AAR
+    cache = Preview_caches.pop(source.as_pointer(), None)
+    # if the cache has been lost we still know what got muted and taken off the source from the armature...
+    muted = cache['muted'] if cache else [tuple(bc) for bc in json.loads(AAR.Preview_muted)] if AAR.Preview_muted else []
+    offset = cache['offset'] if cache else AAR.Preview_offset
+    # unmute the binding constraints, give the source its action back and put its pose back how it was...
+    for b_name, c_name in muted:
+        p_bone = source.pose.bones.get(b_name)
+        if p_bone != None and c_name in p_bone.constraints:
+            p_bone.constraints[c_name].mute = False
+    if offset in bpy.data.actions:
+        if source.animation_data == None:
+            source.animation_data_create()
+        source.animation_data.action = bpy.data.actions[offset]
+    if cache != None and len(source.pose.bones) == len(cache['bases']):
+        source.pose.bones.foreach_set('matrix_basis', cache['bases'].transpose(0, 2, 1).ravel())
+    AAR.Preview_muted, AAR.Preview_offset = "", ""
+    source.update_tag()
+
+def End_Retarget_Preview(source):
+    # stop a preview and switch it off without the update stopping it again...
+    Stop_Retarget_Preview(source)
+    source.data.AAR["Use_preview"] = False
+
+def Clear_Retarget_Previews():
+    # end every preview, (including any that have already lost their cache)
+    sources = {source.as_pointer() : source for source in bpy.data.objects if source.type == 'ARMATURE' and source.data.AAR.Use_preview}
+    for pointer, cache in Preview_caches.items():
+        source = Get_Preview_Source(pointer, cache)
+        if source != None:
+            sources[pointer] = source
+    for source in sources.values():
+        End_Retarget_Preview(source)
+    Preview_caches.clear()
+
+@persistent
+def Preview_Save_Update(dummy):
+    # previews pose their sources from caches that don't get saved, so end them all before saving or loading...
+    Clear_Retarget_Previews()
+
+@persistent
+def Preview_Load_Update(dummy):
+    # loading, undo and redo can free or replace any action or armature, so the bone indices have to go...
+    Clear_Action_Index()
+    # and they can replace or roll back a previews source, drop any caches that no longer belong to a preview...
+    for pointer, cache in list(Preview_caches.items()):
+        source = Get_Preview_Source(pointer, cache)
+        if source == None or not source.data.AAR.Use_preview:
+            del Preview_caches[pointer]
+    # and end any previews that are still switched on without a cache...
+    for source in bpy.data.objects:
+        if source.type == 'ARMATURE' and source.data.AAR.Use_preview and source.as_pointer() not in Preview_caches:
+            End_Retarget_Preview(source)
@@ -67,6 +67,9 @@ class JK_PT_AAR_Armature_Panel(bpy.types.Panel):
         row.prop_search(AAR, "Binding", AAR, "Bindings", text="Binding")
         row.operator("jk.edit_binding", text="", icon='PLUS').Edit = 'ADD'
         row.operator("jk.edit_binding", text="", icon='TRASH').Edit = 'REMOVE'
+        row.operator("jk.auto_bind", text="", icon='AUTO')
+        row.operator("jk.import_binding", text="", icon='IMPORT')
+        row.operator("jk.export_binding", text="", icon='EXPORT')
         row = bind_box.row()
         row.prop(AAR, "Use_offsets")
         row.operator("jk.bake_retarget_actions", text="Bake All Offsets" if AAR.Use_offsets else "Single Bake").Bake_mode = 'ALL' if AAR.Use_offsets else 'SINGLE'
@@ -74,9 +77,17 @@ class JK_PT_AAR_Armature_Panel(bpy.types.Panel):
         row = box.row()
         row.prop(AAR, "Stay_bound")
         row.prop(AAR, "Only_selected")
+        row = box.row()
+        row.prop(AAR, "Use_preview")
         if not AAR.Use_offsets:
             row = box.row()
             row.prop(AAR, "Bake_step")
+        else:
+            row = box.row()
+            row.prop(AAR, "Dirty_only")
+            row = box.row()
+            row.prop(AAR, "Farm_workers")
+            row.operator("jk.bake_retarget_actions", text="Farm Bake").Bake_mode = 'FARM'
         bind_box.enabled = True if AAR.Target != None else False
             
 class JK_PT_AAR_Offset_Panel(bpy.types.Panel):
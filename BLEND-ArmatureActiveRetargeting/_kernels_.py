@@ -0,0 +1,122 @@
+import numpy
+
+# pure numpy rotation conversions, these mirror what mathutils does per rotation but operate on whole arrays of them...
+# (nothing in here should ever need bpy, arrays go in and arrays come out)
+
+# this module is shared by Action Rotation Mode, Switch Transform Space and Armature Active Retargeting, each of them installs on its own so can't import another's copy...
+# every function in here gets used by all three, so keep the copies identical and copy any change to all of them. (matrix helpers live in _poses_)
+
+# the euler orders as (first, second, third) axes and parity, the same table Blender uses internally...
+Euler_orders = {'XYZ' : ((0, 1, 2), False), 'XZY' : ((0, 2, 1), True), 'YXZ' : ((1, 0, 2), True),
+    'YZX' : ((1, 2, 0), False), 'ZXY' : ((2, 0, 1), False), 'ZYX' : ((2, 1, 0), True)}
+
+def Get_Wrapped_Angles(angles):
+    # wrap angles into the -pi to pi range like angle_wrap_rad does, fmod truncates rather than floors so angles below -pi don't get wrapped...
+    # (which keeps the sign of converted quaternions the same as Blender's)
+    return numpy.fmod(angles + numpy.pi, numpy.pi * 2) - numpy.pi
+
+def Get_Normalized_Quaternions(quats):
+    lengths = numpy.sqrt(numpy.einsum('ij,ij->i', quats, quats))
+    normals = quats / numpy.where(lengths != 0.0, lengths, 1.0)[:, None]
+    # zero length quaternions become a half turn around X, the same as normalizing them in mathutils...
+    normals[lengths == 0.0] = (0.0, 1.0, 0.0, 0.0)
+    return normals
+
+def Get_Quaternions_From_Eulers(eulers, order):
+    (i, j, k), parity = Euler_orders[order]
+    # half angles of each axis, with the middle axis flipped for odd parity orders...
+    ti, tj, th = eulers[:, i] * 0.5, eulers[:, j] * (-0.5 if parity else 0.5), eulers[:, k] * 0.5
+    ci, cj, ch = numpy.cos(ti), numpy.cos(tj), numpy.cos(th)
+    si, sj, sh = numpy.sin(ti), numpy.sin(tj), numpy.sin(th)
+    cc, cs, sc, ss = ci * ch, ci * sh, si * ch, si * sh
+    quats = numpy.empty((len(eulers), 4))
+    quats[:, 0] = cj * cc + sj * ss
+    quats[:, i + 1] = cj * sc - sj * cs
+    quats[:, j + 1] = cj * ss + sj * cc
+    quats[:, k + 1] = cj * cs - sj * sc
+    if parity:
+        quats[:, j + 1] = -quats[:, j + 1]
+    return quats
+
+def Get_Quaternions_From_Axis_Angles(axis_angles):
+    # axis angle curves are laid out as W (angle) then XYZ (axis)...
+    angles, axes = Get_Wrapped_Angles(axis_angles[:, 0]), axis_angles[:, 1:4]
+    lengths = numpy.sqrt(numpy.einsum('ij,ij->i', axes, axes))
+    axes = axes / numpy.where(lengths != 0.0, lengths, 1.0)[:, None]
+    quats = numpy.empty((len(axis_angles), 4))
+    quats[:, 0] = numpy.cos(angles * 0.5)
+    quats[:, 1:4] = axes * numpy.sin(angles * 0.5)[:, None]
+    # an axis with no length can't rotate anything...
+    quats[lengths == 0.0] = (1.0, 0.0, 0.0, 0.0)
+    return quats
+
+def Get_Matrices_From_Quaternions(quats):
+    # quaternions need to be normalized first... (returned matrices are indexed [column][row] like Blenders)
+    w, x, y, z = Get_Normalized_Quaternions(quats).T
+    matrices = numpy.empty((len(quats), 3, 3))
+    matrices[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[:, 0, 1] = 2.0 * (w * z + x * y)
+    matrices[:, 0, 2] = 2.0 * (x * z - w * y)
+    matrices[:, 1, 0] = 2.0 * (x * y - w * z)
+    matrices[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[:, 1, 2] = 2.0 * (w * x + y * z)
+    matrices[:, 2, 0] = 2.0 * (w * y + x * z)
+    matrices[:, 2, 1] = 2.0 * (y * z - w * x)
+    matrices[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrices
+
+def Get_Eulers_From_Quaternions(quats, order):
+    (i, j, k), parity = Euler_orders[order]
+    mat = Get_Matrices_From_Quaternions(quats)
+    cy = numpy.hypot(mat[:, i, i], mat[:, i, j])
+    # there are two possible solutions for every rotation that isn't gimbal locked...
+    eul1, eul2 = numpy.empty((len(quats), 3)), numpy.empty((len(quats), 3))
+    eul1[:, i] = numpy.arctan2(mat[:, j, k], mat[:, k, k])
+    eul1[:, j] = numpy.arctan2(-mat[:, i, k], cy)
+    eul1[:, k] = numpy.arctan2(mat[:, i, j], mat[:, i, i])
+    eul2[:, i] = numpy.arctan2(-mat[:, j, k], -mat[:, k, k])
+    eul2[:, j] = numpy.arctan2(-mat[:, i, k], -cy)
+    eul2[:, k] = numpy.arctan2(-mat[:, i, j], -mat[:, i, i])
+    # and only one when it is... (same threshold as Blender uses)
+    locked = cy <= 16.0 * numpy.finfo(numpy.float32).eps
+    eul1[locked, i] = numpy.arctan2(-mat[locked, k, j], mat[locked, j, j])
+    eul1[locked, k] = 0.0
+    eul2[locked] = eul1[locked]
+    if parity:
+        eul1, eul2 = -eul1, -eul2
+    # pick whichever solution has the smallest rotation...
+    use_second = numpy.abs(eul1).sum(axis=1) > numpy.abs(eul2).sum(axis=1)
+    eul1[use_second] = eul2[use_second]
+    return eul1
+
+def Get_Axis_Angles_From_Quaternions(quats):
+    quats = Get_Normalized_Quaternions(quats)
+    half_angles = numpy.arccos(numpy.clip(quats[:, 0], -1.0, 1.0))
+    sines = numpy.sin(half_angles)
+    sines[numpy.abs(sines) < numpy.finfo(numpy.float32).eps] = 1.0
+    axis_angles = numpy.empty((len(quats), 4))
+    axis_angles[:, 0] = half_angles * 2.0
+    axis_angles[:, 1:4] = quats[:, 1:4] / sines[:, None]
+    # a zero axis gets sanitized to X like mathutils does...
+    axis_angles[~numpy.any(axis_angles[:, 1:4], axis=1), 1:4] = (1.0, 0.0, 0.0)
+    return axis_angles
+
+def Get_Continuous_Quaternions(quats):
+    # flip any quaternion that lands in the opposite hemisphere to the one before it... (q and -q are the same rotation)
+    dots = numpy.einsum('ij,ij->i', quats[1:], quats[:-1])
+    signs = numpy.concatenate(([1.0], numpy.cumprod(numpy.where(dots < 0.0, -1.0, 1.0))))
+    return quats * signs[:, None]
+
+def Get_Converted_Rotations(rotations, mode_from, mode_to, continuous=False):
+    # every conversion goes through quaternions...
+    quats = (rotations if mode_from == 'QUATERNION' else
+        Get_Quaternions_From_Axis_Angles(rotations) if mode_from == 'AXIS_ANGLE' else
+        Get_Quaternions_From_Eulers(rotations, mode_from))
+    # which need to stay in the same hemisphere if the rotations are a continuous sequence...
+    if continuous:
+        quats = Get_Continuous_Quaternions(quats)
+    # then out to whatever we want... (eulers get unwrapped so they don't jump by full turns)
+    return (quats if mode_to == 'QUATERNION' else
+        Get_Axis_Angles_From_Quaternions(quats) if mode_to == 'AXIS_ANGLE' else
+        numpy.unwrap(Get_Eulers_From_Quaternions(quats, mode_to), axis=0) if continuous else
+        Get_Eulers_From_Quaternions(quats, mode_to))
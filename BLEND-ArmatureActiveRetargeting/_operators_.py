@@ -1,6 +1,7 @@
 import bpy
+import time
 from . import _functions_
-from bpy.props import (EnumProperty, BoolProperty, StringProperty, PointerProperty, IntProperty)
+from bpy.props import (EnumProperty, BoolProperty, StringProperty, PointerProperty, IntProperty, FloatProperty)
 
 class JK_OT_Bake_Retarget_Actions(bpy.types.Operator):
     """Bakes actions from offsets. (if the offset and/or action are not hidden)"""
@@ -12,36 +13,35 @@ class JK_OT_Bake_Retarget_Actions(bpy.types.Operator):
         items=[('SINGLE', "Single", "Quick bake single action"),
             ('ALL', "All", "Bake all offsets to all of their actions"),
             ('OFFSET', "Offset", "Bake all actions of the offset"),
-            ('ACTION', "Action", "Bake the active offset to the active action of the offset")],
+            ('ACTION', "Action", "Bake the active offset to the active action of the offset"),
+            ('FARM', "Farm", "Bake all offsets to all of their actions in parallel background Blenders")],
         default='ALL')
 
     def execute(self, context):
         source = bpy.context.object
         AAR = source.data.AAR
+        # bakes need the binding constraints and the sources action back...
+        if AAR.Use_preview:
+            AAR.Use_preview = False
+        # (by name, dirty bakes can remove the sources current action and hand its name to the bake that replaced it)
         if source.animation_data and source.animation_data.action:
-            last_action = source.animation_data.action
+            last_name = source.animation_data.action.name
         else:
-            last_action = None
+            last_name = None
+        # if needed, create animation data...
+        if not source.animation_data:
+            source.animation_data_create()
+        # only bake selected bones if we need to...
+        bones = [pb.name for pb in AAR.Pose_bones if pb.Is_bound and source.data.bones[pb.name].select] if AAR.Only_selected else None
+        # the baked actions by what they were baked from, so up to date pairs can be skipped...
+        index, skipped = _functions_.Get_Baked_Index(), 0
         # if we are doing a quick single bake...
         if self.Bake_mode == 'SINGLE':
-            # get the target action...
+            # bake the targets action into a copy of the sources action... (or a new one if it doesn't have one)
             t_action = AAR.Target.animation_data.action
-            # if needed, create animation data...
-            if not source.animation_data:
-                source.animation_data_create()
-            # if the source has an action...
-            if source.animation_data.action:
-                # copy it so it can be overwritten...
-                s_action = source.animation_data.action.copy()
-            else:
-                # otherwise create one...
-                s_action = bpy.data.actions.new(t_action.name)
-            # and set the action to be active and use a fake user then bake...
-            s_action.use_fake_user = True    
-            source.animation_data.action = s_action
-            bpy.ops.nla.bake(frame_start=t_action.frame_range[0], frame_end=t_action.frame_range[1], 
-                step=AAR.Bake_step, only_selected=AAR.Only_selected, 
-                visual_keying=True, clear_constraints=False, clear_parents=False, use_current_action=True, bake_types={'POSE'})
+            baked = _functions_.Bake_Retarget_Action(source, AAR.Target, t_action, step=AAR.Bake_step, bones=bones, 
+                offset=source.animation_data.action)
+            source.animation_data.action = baked
         # if we are multi baking everything...
         elif self.Bake_mode == 'ALL':
             # for every offset...
@@ -52,15 +52,11 @@ class JK_OT_Bake_Retarget_Actions(bpy.types.Operator):
                     for i, offset_action in enumerate(offset.Actions):
                         # if we are baking it...
                         if offset_action.Use:
-                            # copy the offset action and set it to be active...
-                            copy = offset.Action.copy()
-                            copy.use_fake_user = True
-                            source.animation_data.action = copy
-                            # set the offset action to be active and bake...
+                            # set the offset action to be active and bake into a copy of the offset action...
                             offset.Active = i
-                            bpy.ops.nla.bake(frame_start=offset_action.Action.frame_range[0], frame_end=offset_action.Action.frame_range[1], 
-                                step=offset_action.Bake_step, only_selected=AAR.Only_selected, 
-                                visual_keying=True, clear_constraints=False, clear_parents=False, use_current_action=True, bake_types={'POSE'})
+                            baked, is_baked = _functions_.Bake_Retarget_Pair(source, offset.Action, offset_action.Action, offset_action.Bake_step, 
+                                bones, dirty_only=AAR.Dirty_only, index=index)
+                            source.animation_data.action, skipped = baked, skipped + (0 if is_baked else 1)
         # else if we are multi baking an offset...
         elif self.Bake_mode == 'OFFSET':
             # get the active offset...
@@ -68,31 +64,31 @@ class JK_OT_Bake_Retarget_Actions(bpy.types.Operator):
             # for its offset actions... (enumerated)
             for i, offset_action in enumerate(offset.Actions):
                 if offset_action.Use:
-                    # copy the offset action and set it to be active...
-                    copy = offset.Action.copy()
-                    copy.use_fake_user = True
-                    source.animation_data.action = copy
-                    # set the offset action to be active and bake... (will trigger update and make it active on the target)
+                    # set the offset action to be active and bake into a copy of the offset action... 
                     offset.Active = i
-                    bpy.ops.nla.bake(frame_start=offset_action.Action.frame_range[0], frame_end=offset_action.Action.frame_range[1], 
-                        step=offset_action.Bake_step, only_selected=AAR.Only_selected, 
-                        visual_keying=True, clear_constraints=False, clear_parents=False, use_current_action=True, bake_types={'POSE'})
+                    baked, is_baked = _functions_.Bake_Retarget_Pair(source, offset.Action, offset_action.Action, offset_action.Bake_step, 
+                        bones, dirty_only=AAR.Dirty_only, index=index)
+                    source.animation_data.action, skipped = baked, skipped + (0 if is_baked else 1)
         # else if we are single baking from multi bake setup...
         elif self.Bake_mode == 'ACTION':
-            # get the active offset and its active action and bake...
+            # get the active offset and its active action and bake into a copy of the offset action...
             offset = AAR.Offsets[AAR.Offset]
             offset_action = offset.Actions[offset.Active]
-            # copy the offset action and set it to be active...
-            copy = offset.Action.copy()
-            copy.use_fake_user = True
-            source.animation_data.action = copy
-            bpy.ops.nla.bake(frame_start=offset_action.Action.frame_range[0], frame_end=offset_action.Action.frame_range[1], 
-                step=offset_action.Bake_step, only_selected=AAR.Only_selected, 
-                visual_keying=True, clear_constraints=False, clear_parents=False, use_current_action=True, bake_types={'POSE'})
+            baked, is_baked = _functions_.Bake_Retarget_Pair(source, offset.Action, offset_action.Action, offset_action.Bake_step, 
+                bones, dirty_only=AAR.Dirty_only, index=index)
+            source.animation_data.action, skipped = baked, skipped + (0 if is_baked else 1)
+        # else if we are farming everything out to background blenders...
+        elif self.Bake_mode == 'FARM':
+            # the file gets saved as a copy for them to open, so nothing here changes until the baked actions get merged back in...
+            report = _functions_.Run_Retarget_Farm(source, workers=AAR.Farm_workers, dirty_only=AAR.Dirty_only)
+            if report['failed'] or report['failed_jobs']:
+                self.report({'WARNING'}, str(report['failed']) + " farm workers and " + str(report['failed_jobs']) + " bakes failed, check the console for details")
+        if skipped:
+            self.report({'INFO'}, "Skipped " + str(skipped) + " up to date actions")
         # if we want to stay bound to target after baking...
         if AAR.Stay_bound:
-            if last_action != None:
-                source.animation_data.action = last_action
+            if last_name != None and last_name in bpy.data.actions:
+                source.animation_data.action = bpy.data.actions[last_name]
             #else: what should happen here...
         else:
             # otherwise set the target to None to remove all the bindings...
@@ -120,8 +116,7 @@ class JK_OT_Add_Action_Slot(bpy.types.Operator):
             new_offset.Armature = source
         elif self.All:
             offset = AAR.Offsets[AAR.Offset]
-            actions = [a for a in bpy.data.actions if any(b.name in fc.data_path for b in target.data.bones for fc in a.fcurves)]
-            for action in actions:
+            for action in _functions_.Get_Compatible_Actions(target):
                 new_action = offset.Actions.add()
                 new_action.Armature = target
                 new_action.Action = action
@@ -181,7 +176,7 @@ class JK_OT_Edit_Binding(bpy.types.Operator):
                 AAR.Bindings.remove(b_index)
                 AAR.Binding = ""
         elif self.Edit == 'SAVE':
-            if self.Name not in AAR.Bindings:
+            if self.Name in AAR.Bindings:
                 binding = AAR.Bindings[self.Name]
                 _functions_.Get_Binding(armature, binding)
             else:
@@ -216,6 +211,106 @@ class JK_OT_Edit_Binding(bpy.types.Operator):
             if self.Name not in AAR.Bindings:
                 layout.label(text="There is no binding with this name!", icon='ERROR')
 
+class JK_OT_Export_Binding(bpy.types.Operator):
+    """Exports the active binding to a json file"""
+    bl_idname = "jk.export_binding"
+    bl_label = "Export Binding"
+
+    filepath: StringProperty(name="File Path", description="The json file to export to", subtype='FILE_PATH')
+
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        AAR = context.object.data.AAR
+        return AAR.Binding in AAR.Bindings
+
+    def execute(self, context):
+        AAR = bpy.context.object.data.AAR
+        # make sure what we export is what the bones currently have...
+        _functions_.Get_Binding(bpy.context.object, AAR.Bindings[AAR.Binding])
+        _functions_.Write_Binding_File(AAR.Bindings[AAR.Binding], bpy.path.ensure_ext(self.filepath, ".json"))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        self.filepath = bpy.path.ensure_ext(bpy.path.clean_name(context.object.data.AAR.Binding), ".json")
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class JK_OT_Import_Binding(bpy.types.Operator):
+    """Imports a binding from a json file and makes it the active binding"""
+    bl_idname = "jk.import_binding"
+    bl_label = "Import Binding"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filepath: StringProperty(name="File Path", description="The json file to import from", subtype='FILE_PATH')
+
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        source = bpy.context.object
+        AAR = source.data.AAR
+        try:
+            binding = _functions_.Read_Binding_File(source, self.filepath)
+        except (OSError, ValueError, KeyError):
+            self.report({'ERROR'}, "Could not read a binding from " + self.filepath)
+            return {'CANCELLED'}
+        # if it's already the active binding it won't update, so set it ourselves...
+        if AAR.Binding == binding.name:
+            _functions_.Set_Binding(source, binding)
+        else:
+            AAR.Binding = binding.name
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class JK_OT_Auto_Bind(bpy.types.Operator):
+    """Binds every pose bone to the target bone that best matches it by name, hierarchy and rest position"""
+    bl_idname = "jk.auto_bind"
+    bl_label = "Auto Bind"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    Only_unbound: BoolProperty(name="Only Unbound", description="Only bind bones that are not already bound, to target bones that are not already used. (rebinds every bone if False)",
+        default=False, options=set())
+
+    Name_weight: FloatProperty(name="Name", description="How much bone names matter when matching bones", 
+        default=1.0, min=0.0)
+
+    Hierarchy_weight: FloatProperty(name="Hierarchy", description="How much the depth of bones in their hierarchies matters when matching bones", 
+        default=0.5, min=0.0)
+
+    Proximity_weight: FloatProperty(name="Proximity", description="How much the rest positions of bones matter when matching bones", 
+        default=1.0, min=0.0)
+
+    Threshold: FloatProperty(name="Threshold", description="Bones that can't be matched for less than this get left unbound", 
+        default=1.0, min=0.0)
+
+    @classmethod
+    def poll(cls, context):
+        # there's nothing to bind to without a target...
+        return context.object and context.object.type == 'ARMATURE' and context.object.data.AAR.Target != None
+
+    def execute(self, context):
+        start = time.perf_counter()
+        source = bpy.context.object
+        AAR = source.data.AAR
+        target = AAR.Target
+        if self.Only_unbound:
+            names = [pb.name for pb in AAR.Pose_bones if not pb.Is_bound]
+            used = {pb.Target for pb in AAR.Pose_bones if pb.Is_bound}
+            t_names = [bone.name for bone in target.data.bones if bone.name not in used]
+        else:
+            names, t_names = [pb.name for pb in AAR.Pose_bones], None
+        # solve the whole mapping at once then bind it all in one go...
+        mapping = _functions_.Get_Bone_Correspondence(source, target, names, t_names=t_names, name_weight=self.Name_weight, 
+            hierarchy_weight=self.Hierarchy_weight, proximity_weight=self.Proximity_weight, threshold=self.Threshold)
+        _functions_.Bind_Pose_Bones(source, target, mapping)
+        self.report({'INFO'}, "Bound " + str(sum(1 for tb_name in mapping.values() if tb_name != "")) + " of " + str(len(mapping)) + " bones in " 
+            + str(round(time.perf_counter() - start, 3)) + " seconds")
+        return {'FINISHED'}
+
 class JK_OT_Auto_Offset(bpy.types.Operator):
     """Automatically calculates transform offsets"""
     bl_idname = "jk.auto_offset"
@@ -1,4 +1,5 @@
 import bpy
+import time
 from . import _functions_
 from bpy.props import (BoolProperty, BoolVectorProperty, StringProperty, EnumProperty, FloatProperty, FloatVectorProperty, IntProperty, IntVectorProperty, CollectionProperty, PointerProperty) 
 
@@ -30,12 +31,7 @@ class JK_AAR_Pose_Bone_Props(bpy.types.PropertyGroup):
     
     def Update_Hide_Binding(self, context):
         source = bpy.context.object
-        target = source.data.AAR.Target
-        sa_bones, ta_bones = source.data.bones, target.data.bones
-        if self.Target in ta_bones:
-            ta_bones[self.Target].hide = self.Hide_target
-        if self.Retarget in sa_bones:
-            sa_bones[self.Retarget].hide = self.Hide_retarget
+        _functions_.Set_Binding_Hidden(source, source.data.AAR.Target, self)
 
     Hide_target: BoolProperty(name="Hide Target", description="Hide the target bone we are taking the action from",
         default=True, options=set(), update=Update_Hide_Binding)
@@ -53,7 +49,7 @@ class JK_AAR_Pose_Bone_Props(bpy.types.PropertyGroup):
                 # check if this bone is already bound to a target...
                 if self.Is_bound:
                     _functions_.Unbind_Pose_Bone(source, self.name, self.Retarget)
-                _functions_.Bind_Pose_Bone(source, target, self.name, self.Target)
+                _functions_.Bind_Pose_Bone(source, target, self.name, self.Target, poles=_functions_.Get_Pole_Names(source))
         else:
             # and if the target was invalid unbind it...
             _functions_.Unbind_Pose_Bone(source, self.name, self.Retarget)
@@ -92,10 +88,23 @@ class JK_AAR_Offset_Slot_Props(bpy.types.PropertyGroup):
     
     Actions: CollectionProperty(type=JK_AAR_Offset_Action_Slot_Props)
 
+class JK_AAR_Action_Props(bpy.types.PropertyGroup):
+
+    Is_offset: BoolProperty(name="Is Offset", description="Is this action an offset action",
+        default=False, options=set())
+
+    Offset_name: StringProperty(name="Offset", description="The offset action this action was baked from", default="", maxlen=1024)
+
+    Target_name: StringProperty(name="Target", description="The target action this action was baked from", default="", maxlen=1024)
+
+    Bake_hash: StringProperty(name="Bake Hash", description="Hash of everything this action was baked from. (empty if it isn't a bake)", default="", maxlen=1024)
+
 class JK_AAR_Binding_Props(bpy.types.PropertyGroup):
 
     Bindings: CollectionProperty(type=JK_AAR_Binding_Bone_Props)
 
+    Blob: StringProperty(name="Blob", description="The binding of every bone packed as json", default="")
+
 class JK_AAR_Armature_Props(bpy.types.PropertyGroup):
     
     Is_bound: BoolProperty(name="Is Bound", description="Is this armature currently bound to another for retargeting",
@@ -114,7 +123,11 @@ class JK_AAR_Armature_Props(bpy.types.PropertyGroup):
         return object.type == 'ARMATURE' and object != bpy.context.object and not object.data.AAR.Is_bound
 
     def Target_Update(self, context):
+        start = time.perf_counter()
         source = bpy.context.object
+        # a preview of the old target has to go...
+        if self.Use_preview:
+            self.Use_preview = False
         self.Binding = ""
         if self.Target != None:
             if len(self.Pose_bones) > 0:
@@ -126,6 +139,7 @@ class JK_AAR_Armature_Props(bpy.types.PropertyGroup):
             _functions_.Add_Retarget_Bones(source, [pb.name for pb in self.Pose_bones])
             # register the source as bound...
             self.Is_bound = True
+            print("Set up " + str(len(self.Pose_bones)) + " retarget bones for " + self.Target.name + " in " + str(round(time.perf_counter() - start, 3)) + " seconds...")
         else:
             for pb in self.Pose_bones:
                 if pb.Is_bound:
@@ -193,6 +207,28 @@ class JK_AAR_Armature_Props(bpy.types.PropertyGroup):
     
     Bake_step: IntProperty(name="Bake Step", default=1, min=1)
 
+    Dirty_only: BoolProperty(name="Dirty Only", description="Only bake offset/action pairs that have changed since they were last baked, replacing their old bakes. (bakes a new copy of everything if False)",
+        default=False, options=set())
+
+    def Preview_Update(self, context):
+        source = bpy.context.object
+        if self.Use_preview:
+            # if there's nothing to preview turn it back off...
+            if not _functions_.Start_Retarget_Preview(source):
+                self["Use_preview"] = False
+        else:
+            _functions_.Stop_Retarget_Preview(source)
+
+    Use_preview: BoolProperty(name="Preview", description="Scrub a cached retarget of the targets action with the binding constraints muted. (evaluates the binding constraints live if False)",
+        default=False, options=set(), update=Preview_Update)
+
+    Preview_muted: StringProperty(name="Preview Muted", description="The bone and constraint names a preview has muted. (as JSON)", default="")
+
+    Preview_offset: StringProperty(name="Preview Offset", description="The name of the action a preview has taken off the source", default="")
+
+    Farm_workers: IntProperty(name="Farm Workers", description="How many background Blenders a farm bake runs at once. (0 uses one per CPU core)", 
+        default=0, min=0)
+
     Only_selected: BoolProperty(name="Only Selected", description="Only bake selected bones",
         default=False, options=set())
 
@@ -0,0 +1,94 @@
+# Contributor(s): James Goldsworthy (Jim Kroovy)
+
+# This code is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+##### NOTES #####
+
+# Runs B.L.E.N.D jobs over lots of .blend files in parallel background Blenders, no interface needed...
+#
+# python _runner_.py --blender /path/to/blender --spec jobs.json --report report.json --workers 4 a.blend b.blend ...
+#
+# The spec is a json file with a list of jobs that get run in order on every file... (see _worker_.py for what each job takes)
+#
+# {"jobs" : [{"type" : "ROTATION", "mode_from" : "QUATERNION", "mode_to" : "XYZ"},
+#     {"type" : "RETIME", "fps_from" : 24, "fps_to" : 30},
+#     {"type" : "RETARGET", "source" : "Mannequin", "target" : "Mocap"}],
+#     "save" : true}
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import concurrent.futures
+
+Worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_worker_.py")
+
+def Get_Arguments(argv):
+    parser = argparse.ArgumentParser(description="Run B.L.E.N.D jobs on .blend files in parallel background Blender processes")
+    parser.add_argument("files", nargs="+", help="The .blend files to run the jobs on")
+    parser.add_argument("--spec", required=True, help="The json file of jobs to run on each file")
+    parser.add_argument("--report", default="blend_report.json", help="Where to write the json timing report")
+    parser.add_argument("--blender", default="blender", help="The Blender executable to run")
+    parser.add_argument("--workers", type=int, default=0, help="How many Blenders to run at once. (0 uses one per CPU core)")
+    return parser.parse_args(argv)
+
+def Run_File(blender, spec, path):
+    start = time.perf_counter()
+    # each blender writes its own little result file for us to collect...
+    handle, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    command = [blender, "-b", path, "--python", Worker_path, "--", "--spec", spec, "--result", result_path]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    try:
+        with open(result_path) as file:
+            result = json.load(file)
+    # if blender fell over before it could write anything there's no result...
+    except (OSError, ValueError):
+        result = {'jobs' : [], 'error' : "No result written by the worker"}
+    os.remove(result_path)
+    result['file'], result['returncode'], result['seconds'] = path, process.returncode, time.perf_counter() - start
+    # keep the tail of the output around if something went wrong...
+    if process.returncode != 0 or 'error' in result:
+        result['output'] = process.stdout[-4000:]
+    return result
+
+def Run_Files(blender, spec, paths, workers):
+    start = time.perf_counter()
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    results = []
+    # the heavy lifting happens in the blender processes so threads are all we need to wait on them...
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        futures = {executor.submit(Run_File, blender, spec, path) : path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(("Finished " if result['returncode'] == 0 and 'error' not in result else "Failed ") + result['file'] + " in " + str(round(result['seconds'], 3)) + " seconds...")
+    results.sort(key=lambda result: paths.index(result['file']))
+    return {'spec' : spec, 'workers' : workers, 'files' : results, 'failed' : sum(1 for result in results if result['returncode'] != 0 or 'error' in result), 
+        'seconds' : time.perf_counter() - start}
+
+def main(argv=None):
+    args = Get_Arguments(sys.argv[1:] if argv == None else argv)
+    paths = [os.path.abspath(path) for path in args.files]
+    report = Run_Files(args.blender, os.path.abspath(args.spec), paths, args.workers)
+    with open(args.report, 'w') as file:
+        json.dump(report, file, indent=4)
+    print("Ran " + str(len(paths)) + " files (" + str(report['failed']) + " failed) in " + str(round(report['seconds'], 3)) + " seconds...")
+    return 1 if report['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
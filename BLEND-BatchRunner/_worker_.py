@@ -0,0 +1,139 @@
+# Contributor(s): James Goldsworthy (Jim Kroovy)
+
+# This code is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+##### NOTES #####
+
+# Gets run inside a background Blender by _runner_.py... (blender -b file.blend --python _worker_.py -- --spec jobs.json --result result.json)
+#
+# Every job calls straight into the add-ons functions, so there's no operators, dialogs, areas or selections involved.
+#
+# ROTATION - {"mode_from" : "QUATERNION", "mode_to" : "XYZ", "actions" : null, "armature" : null, "bones" : null, "object" : false, "remove" : false, 
+#     "batched" : true, "pooled" : false, "workers" : 0, "exact" : false, "samples" : 4, "tolerance" : 0.001}
+# RETIME - {"fps_from" : 24, "fps_to" : 30, "offset" : 0.0, "set_fps" : true, "actions" : null}
+# RETARGET - {"source" : "Source", "target" : "Target", "actions" : null, "step" : 1, "bones" : null}
+# SPACE - {"mode_from" : "LOCAL", "mode_to" : "WORLD", "actions" : null, "armature" : null, "bones" : null, "object" : false}
+#
+# "actions" : null means all of them, (or for retargeting the targets active action) "bones" : null means all of them. (or for retargeting all the bound ones)
+
+import bpy
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import traceback
+
+# the add-on folders all live next to this one...
+Repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def Get_Arguments():
+    # blender keeps its own arguments before the "--"...
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Run B.L.E.N.D jobs on the open .blend file")
+    parser.add_argument("--spec", required=True, help="The json file of jobs to run")
+    parser.add_argument("--result", required=True, help="Where to write the json result")
+    return parser.parse_args(argv)
+
+def Get_Addon(name):
+    # if the add-on is installed and enabled just use it...
+    if name in bpy.context.preferences.addons and name in sys.modules:
+        return sys.modules[name]
+    # otherwise import it from the folder next to this one and register it ourselves... (just the once)
+    if Repo_path not in sys.path:
+        sys.path.append(Repo_path)
+    module = importlib.import_module(name)
+    if not getattr(module, "JK_batch_registered", False):
+        module.register()
+        module.JK_batch_registered = True
+    return module
+
+def Get_Actions(names):
+    return [action for action in bpy.data.actions] if names == None else [bpy.data.actions[name] for name in names]
+
+def Run_Rotation(job):
+    addon = Get_Addon("BLEND-ActionRotationMode")
+    actions = Get_Actions(job.get('actions'))
+    # the bones we are switching come from the armature rather than the selection...
+    armature = bpy.data.objects[job['armature']] if job.get('armature') else None
+    bones = job.get('bones')
+    selection = [pb for pb in armature.pose.bones if bones == None or pb.name in bones] if armature else []
+    objects = [ob for ob in bpy.data.objects if ob.animation_data and ob.animation_data.action in actions]
+    addon._functions_.Set_Action_Rotation_Modes(actions, job['mode_from'], job['mode_to'], job.get('remove', False), selection, objects, job.get('object', False), 
+        batched=job.get('batched', True), pooled=job.get('pooled', False), workers=job.get('workers', 0), 
+        exact=job.get('exact', False), samples=job.get('samples', 4), tolerance=job.get('tolerance', 0.001))
+    return {'actions' : len(actions), 'bones' : len(selection)}
+
+def Run_Retime(job):
+    addon = Get_Addon("BLEND-ActionScaleLength")
+    # no actions given means the whole library gets retimed... (strips, markers and scenes included)
+    if job.get('actions') == None:
+        return addon._functions_.Retime_Library(job['fps_from'], job['fps_to'], job.get('offset', 0.0), set_fps=job.get('set_fps', True))
+    actions = Get_Actions(job['actions'])
+    for action in actions:
+        addon._functions_.Scale_By_Framerate(action, job['fps_from'], job['fps_to'], job.get('offset', 0.0), False)
+        action.SAL.Framerate = job['fps_to']
+    return {'actions' : len(actions)}
+
+def Run_Retarget(job):
+    addon = Get_Addon("BLEND-ArmatureActiveRetargeting")
+    source, target = bpy.data.objects[job['source']], bpy.data.objects[job['target']]
+    # no actions given means we bake whatever the target is currently playing...
+    actions = Get_Actions(job['actions']) if job.get('actions') != None else [target.animation_data.action]
+    baked = [addon._functions_.Bake_Retarget_Action(source, target, action, step=job.get('step', 1), bones=job.get('bones')).name for action in actions]
+    return {'actions' : len(actions), 'baked' : baked}
+
+def Run_Space(job):
+    addon = Get_Addon("BLEND-SwitchTransformSpace")
+    actions = Get_Actions(job.get('actions'))
+    armature = bpy.data.objects[job['armature']] if job.get('armature') else None
+    bones = job.get('bones')
+    names = [pb.name for pb in armature.pose.bones if bones == None or pb.name in bones] if armature else []
+    for action in actions:
+        objects = [ob for ob in bpy.data.objects if ob.animation_data and ob.animation_data.action == action] if job.get('object', False) else []
+        addon._functions_.Set_Transform_Space_Curves(action, job['mode_from'], job['mode_to'], armature, names, objects)
+    return {'actions' : len(actions), 'bones' : len(names)}
+
+Jobs = {'ROTATION' : Run_Rotation, 'RETIME' : Run_Retime, 'RETARGET' : Run_Retarget, 'SPACE' : Run_Space}
+
+def main():
+    args = Get_Arguments()
+    with open(args.spec) as file:
+        spec = json.load(file)
+    result, start = {'jobs' : []}, time.perf_counter()
+    for job in spec['jobs']:
+        job_start = time.perf_counter()
+        # if a job fails record why and stop, the file won't get saved half done...
+        try:
+            info = Jobs[job['type']](job)
+        except Exception:
+            result['error'] = traceback.format_exc()
+            result['jobs'].append({'type' : job.get('type'), 'seconds' : time.perf_counter() - job_start, 'failed' : True})
+            break
+        result['jobs'].append({'type' : job['type'], 'seconds' : time.perf_counter() - job_start, 'info' : info})
+    # save the file if everything went okay... (optionally as a copy with a suffix)
+    if 'error' not in result and spec.get('save', True):
+        save_start = time.perf_counter()
+        if spec.get('suffix'):
+            path = os.path.splitext(bpy.data.filepath)[0] + spec['suffix'] + ".blend"
+            bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+        else:
+            bpy.ops.wm.save_mainfile()
+        result['save_seconds'] = time.perf_counter() - save_start
+    result['blender_seconds'] = time.perf_counter() - start
+    with open(args.result, 'w') as file:
+        json.dump(result, file, indent=4, default=str)
+
+main()
@@ -1,90 +1,314 @@
 import bpy
+import numpy
 
 def Add_To_Pose_Menu(self, context):
     self.layout.operator("jk.apply_mesh_posing", icon='MESH_DATA')
 
-def Orient_Bones(armature, AAR, rot, sca, source):
-    bpy.ops.object.mode_set(mode='OBJECT')
-    # make sure we bring the target armature...
-    target = AAR.Target
-    target.hide_set(False)
-    target.select_set(True)
-    # into edit mode with the armature...
-    bpy.ops.object.mode_set(mode='EDIT')
-    # iterate on AARs bound pose bone collection...
+def Get_Partner_Index(armature):
+    # map control bones to their first mech bone and mech bones to the source bone that copies them, one pass over the bones each...
+    mechs, sources = {}, {}
+    for bone in armature.data.bones:
+        if bone.ACB.Type == 'MECH' and bone.parent:
+            mechs.setdefault(bone.parent.name, bone.name)
+    for p_bone in armature.pose.bones:
+        if p_bone.bone.ACB.Type == 'SOURCE' and "MECHANISM - Copy Transform" in p_bone.constraints:
+            sources.setdefault(p_bone.constraints["MECHANISM - Copy Transform"].subtarget, p_bone.name)
+    return mechs, sources
+
+def Get_Orient_Pairs(armature, target, AAR, source):
+    # work out which edit bone gets oriented to which target bone, (and which mech bone follows it) without going into edit mode...
+    a_mechs, a_sources = Get_Partner_Index(armature) if source else ({}, {})
+    t_mechs = Get_Partner_Index(target)[0] if source else {}
+    pairs = []
     for pb in AAR.Pose_bones:
-        # if the target bone name is in the targets edit bones.. (it should be if it's bound)
-        if pb.Target in target.data.edit_bones:
-            # we need both source and target edit bones...
-            if source and armature.data.bones[pb.name].ACB.Type == 'CONT':
-                cont = armature.data.bones[pb.name]
-                mech = [mb.name for mb in armature.data.bones if mb.ACB.Type == 'MECH' and mb.parent == cont]
-                source = [spb.name for spb in armature.pose.bones if spb.bone.ACB.Type == 'SOURCE' 
-                    and spb.constraints["MECHANISM - Copy Transform"].subtarget == mech[0]]
-                se_name = source[0]
-                me_bone = armature.data.edit_bones[mech[0]]
+        # if the target bone name is in the targets bones.. (it should be if it's bound)
+        if pb.Target in target.data.bones:
+            # if there are armature control bones on the armature we orient the source bone and its mech bone follows...
+            if source and armature.data.bones[pb.name].ACB.Type == 'CONT' and a_sources.get(a_mechs.get(pb.name)):
+                se_name, me_name = a_sources[a_mechs[pb.name]], a_mechs[pb.name]
             else:
-                se_name = pb.name #armature.data.edit_bones[pb.name]
-                me_bone = None
-            # if there are armature control bones and we want to orient to the targets source bones...
-            if source and target.data.bones[pb.Target].ACB.Type == 'CONT':
-                # just orient to the mech bone because it's rest pose must be the same as the source bones...
-                cont = target.data.bones[pb.Target]
-                mech = [mb.name for mb in target.data.bones if mb.ACB.Type == 'MECH' and mb.parent == cont]
-                te_name = mech[0]
+                se_name, me_name = pb.name, None
+            # if there are armature control bones on the target just orient to the mech bone because it's rest pose must be the same as the source bones...
+            if source and target.data.bones[pb.Target].ACB.Type == 'CONT' and pb.Target in t_mechs:
+                te_name = t_mechs[pb.Target]
             else:
                 te_name = pb.Target
-            se_bone = armature.data.edit_bones[se_name]
-            te_bone = target.data.edit_bones[te_name]
-            # if we are orienting rotation...
+            pairs.append((se_name, me_name, te_name))
+    return pairs
+
+def Orient_Bones(armature, AAR, rot, sca, source):
+    bpy.ops.object.mode_set(mode='OBJECT')
+    target = AAR.Target
+    pairs = Get_Orient_Pairs(armature, target, AAR, source)
+    # the targets y axes, rolls and lengths can all come from its rest matrices, so it never needs to go into edit mode...
+    t_axes, t_rolls, t_lengths = [], [], []
+    for _, _, te_name in pairs:
+        t_bone = target.data.bones[te_name]
+        axis, roll = bpy.types.Bone.AxisRollFromMatrix(t_bone.matrix_local.to_3x3())
+        t_axes.append(axis.normalized()[:]), t_rolls.append(roll), t_lengths.append(t_bone.length)
+    t_axes, t_rolls, t_lengths = numpy.array(t_axes).reshape(-1, 3), numpy.array(t_rolls), numpy.array(t_lengths)
+    # then one trip into edit mode to read every bone, orient them all at once and write them back...
+    bpy.ops.object.mode_set(mode='EDIT')
+    e_bones = armature.data.edit_bones
+    count, indices = len(e_bones), {e_bone.name : i for i, e_bone in enumerate(e_bones)}
+    heads, tails, rolls = numpy.empty(count * 3, dtype=numpy.float32), numpy.empty(count * 3, dtype=numpy.float32), numpy.empty(count, dtype=numpy.float32)
+    e_bones.foreach_get('head', heads)
+    e_bones.foreach_get('tail', tails)
+    e_bones.foreach_get('roll', rolls)
+    heads, tails = heads.reshape(-1, 3).astype(numpy.float64), tails.reshape(-1, 3).astype(numpy.float64)
+    # writing them back in bulk skips moving connected childrens heads to their parents tails, so we need the hierarchy to do that ourselves...
+    connects = numpy.empty(count, dtype=bool)
+    e_bones.foreach_get('use_connect', connects)
+    parents = numpy.array([indices[e_bone.parent.name] if e_bone.parent else -1 for e_bone in e_bones], dtype=int)
+    depths, current = numpy.zeros(count, dtype=int), parents.copy()
+    while numpy.any(current >= 0):
+        depths[current >= 0] += 1
+        current[current >= 0] = parents[current[current >= 0]]
+    connected = connects & (parents >= 0)
+    se_indices = numpy.array([indices[se_name] for se_name, _, _ in pairs], dtype=int)
+    if len(se_indices):
+        # work down the hierarchy a generation at a time, so bones get oriented from where their connected parents left their heads...
+        for depth in range(depths.max() + 1):
+            level = numpy.flatnonzero(connected & (depths == depth))
+            heads[level] = tails[parents[level]]
+            oriented = numpy.flatnonzero(depths[se_indices] == depth)
+            if not len(oriented):
+                continue
+            e_indices = se_indices[oriented]
+            vectors = tails[e_indices] - heads[e_indices]
+            lengths = numpy.sqrt(numpy.einsum('ij,ij->i', vectors, vectors))
+            # if we are orienting rotation point the bones down the targets y axes and copy their rolls...
             if rot:
-                # do some vector math...
-                y_vec = te_bone.y_axis
-                se_bone.tail = se_bone.head + (y_vec * se_bone.length)
-                se_bone.roll = te_bone.roll
+                tails[e_indices] = heads[e_indices] + t_axes[oriented] * lengths[:, None]
+                rolls[e_indices] = t_rolls[oriented]
             # and setting scale is as simple as setting the length...
             if sca:
-                se_bone.length = te_bone.length
-            if me_bone != None:
-                me_bone.head, me_bone.tail, me_bone.roll = se_bone.head, se_bone.tail, se_bone.roll
-    # back to object mode and deselect the target...
+                vectors = tails[e_indices] - heads[e_indices]
+                directions = vectors / numpy.where(lengths > 0.0, lengths, 1.0)[:, None]
+                tails[e_indices] = heads[e_indices] + directions * t_lengths[oriented, None]
+        # mech bones follow their source bones...
+        for se_name, me_name, _ in pairs:
+            if me_name != None:
+                heads[indices[me_name]], tails[indices[me_name]], rolls[indices[me_name]] = heads[indices[se_name]], tails[indices[se_name]], rolls[indices[se_name]]
+        # and anything connected to them needs its head snapping on again...
+        for depth in range(1, depths.max() + 1):
+            level = numpy.flatnonzero(connected & (depths == depth))
+            heads[level] = tails[parents[level]]
+        e_bones.foreach_set('head', heads.astype(numpy.float32).ravel())
+        e_bones.foreach_set('tail', tails.astype(numpy.float32).ravel())
+        e_bones.foreach_set('roll', rolls)
+    # back to object mode...
     bpy.ops.object.mode_set(mode='OBJECT')
-    target.select_set(False)
     
-def Apply_Mesh_Posing(armature, keep_original):
+def Get_Armature_Meshes(armature):
+    # all the meshes with an armature modifier using the armature...
+    return [ob for ob in bpy.context.scene.objects if ob.type == 'MESH' and any(mod.type == 'ARMATURE' and mod.object == armature for mod in ob.modifiers)]
+
+def Copy_Meshes(meshes):
+    # copy the objects and their mesh data into the same collections, no need for the duplicate operator...
+    copies = []
+    for mesh in meshes:
+        copy = mesh.copy()
+        copy.data = mesh.data.copy()
+        for collection in mesh.users_collection:
+            collection.objects.link(copy)
+        copies.append(copy)
+    return copies
+
+def Get_Posed_Coordinates(armature, meshes, index=0):
+    # only show the armature modifiers and one shape key so the depsgraph gives us what applying the modifier would...
+    states = {}
+    for mesh in meshes:
+        states[mesh] = ([(mod, mod.show_viewport) for mod in mesh.modifiers], mesh.show_only_shape_key, mesh.active_shape_key_index, None)
+        for mod in mesh.modifiers:
+            mod.show_viewport = mod.type == 'ARMATURE' and mod.object == armature
+        if mesh.data.shape_keys:
+            mesh.show_only_shape_key, mesh.active_shape_key_index = True, index
+            # (a muted or vertex grouped key would show the basis instead of itself)
+            key = mesh.data.shape_keys.key_blocks[index]
+            states[mesh] = states[mesh][:3] + ((key, key.mute, key.vertex_group),)
+            key.mute, key.vertex_group = False, ""
+    # then every mesh gets evaluated together in one go...
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    coordinates = {}
+    for mesh in meshes:
+        evaluated = mesh.evaluated_get(depsgraph).data
+        # the armature modifier never changes topology, but if something has we can't write it back...
+        if len(evaluated.vertices) == len(mesh.data.vertices):
+            coordinates[mesh] = numpy.empty(len(evaluated.vertices) * 3, dtype=numpy.float32)
+            evaluated.vertices.foreach_get('co', coordinates[mesh])
+        else:
+            print("'Apply Mesh Posing' could not apply " + mesh.name + " as its vertex count changed when evaluated...")
+    # put the modifiers and shape key display back how they were...
+    for mesh, (modifiers, show_only, active_index, key_state) in states.items():
+        for mod, show_viewport in modifiers:
+            mod.show_viewport = show_viewport
+        mesh.show_only_shape_key, mesh.active_shape_key_index = show_only, active_index
+        if key_state != None:
+            key, mute, vertex_group = key_state
+            key.mute, key.vertex_group = mute, vertex_group
+    return coordinates
+
+def Get_Posed_Keys(armature, meshes):
+    # the depsgraph only shows one shape key at a time, so shape keyed meshes get evaluated once per key... (all before anything gets written)
+    posed = {}
+    counts = {mesh : len(mesh.data.shape_keys.key_blocks) if mesh.data.shape_keys else 1 for mesh in meshes}
+    for index in range(max(counts.values(), default=0)):
+        for mesh, coordinates in Get_Posed_Coordinates(armature, [mesh for mesh in meshes if index < counts[mesh]], index=index).items():
+            posed.setdefault(mesh, {})[index] = coordinates
+    return posed
+
+def Set_Posed_Coordinates(mesh, keys):
+    data = mesh.data
+    # every shape key got posed by the modifier the same way the basis did...
+    if data.shape_keys:
+        for index, key in enumerate(data.shape_keys.key_blocks):
+            if index in keys:
+                key.data.foreach_set('co', keys[index])
+    data.vertices.foreach_set('co', keys[0])
+    data.update()
+
+def Get_Evaluated_Coordinates(mesh):
+    evaluated = mesh.evaluated_get(bpy.context.evaluated_depsgraph_get()).data
+    coordinates = numpy.empty(len(evaluated.vertices) * 3, dtype=numpy.float32)
+    evaluated.vertices.foreach_get('co', coordinates)
+    return coordinates.reshape(-1, 3).astype(numpy.float64)
+
+def Get_Skinning_Weights(mesh, names):
+    # get the weights of the named vertex groups as flat arrays of vertex, group and weight...
+    v_count = len(mesh.data.vertices)
+    v_groups = [vg for vg in mesh.vertex_groups if vg.name in names]
+    # there's no bulk read of vertex weights, but a displace modifier without a texture moves each vertex along its axis by its weight in a group...
+    # (so with one on each axis every evaluation of the mesh reads three whole groups at once)
+    states = ([(mod, mod.show_viewport) for mod in mesh.modifiers], mesh.show_only_shape_key, mesh.active_shape_key_index)
+    for mod in mesh.modifiers:
+        mod.show_viewport = False
+    if mesh.data.shape_keys:
+        mesh.show_only_shape_key, mesh.active_shape_key_index = True, 0
+    displaces = [mesh.modifiers.new(name="SKINNING - Weights " + axis, type='DISPLACE') for axis in ['X', 'Y', 'Z']]
+    rows, groups, weights = [], [], []
+    try:
+        for displace in displaces:
+            displace.show_viewport = False
+        rests = Get_Evaluated_Coordinates(mesh)
+        # a big strength keeps the weights from getting lost in the float precision of the coordinates...
+        strength = 1000.0 * max(numpy.abs(rests).max(initial=0.0), 1.0)
+        for displace, axis in zip(displaces, ['X', 'Y', 'Z']):
+            displace.direction, displace.space, displace.mid_level, displace.strength = axis, 'LOCAL', 0.0, strength
+        for first in range(0, len(v_groups), 3):
+            chunk = v_groups[first:first + 3]
+            for i, displace in enumerate(displaces):
+                displace.show_viewport = i < len(chunk)
+                displace.vertex_group = chunk[i].name if i < len(chunk) else ""
+            coordinates = Get_Evaluated_Coordinates(mesh)
+            if len(coordinates) != v_count:
+                print("'Apply Mesh Posing' could not read the weights of " + mesh.name + " as its vertex count changed when evaluated...")
+                break
+            for i, vg in enumerate(chunk):
+                # vertices outside the group don't move at all...
+                moved = (coordinates[:, i] - rests[:, i]) / strength
+                indices = numpy.flatnonzero(moved > 0.0)
+                rows.append(indices), groups.append(numpy.full(len(indices), vg.index)), weights.append(moved[indices])
+    finally:
+        for displace in displaces:
+            mesh.modifiers.remove(displace)
+        for mod, show_viewport in states[0]:
+            mod.show_viewport = show_viewport
+        mesh.show_only_shape_key, mesh.active_shape_key_index = states[1], states[2]
+    if not rows:
+        return numpy.empty(0, dtype=int), numpy.empty(0, dtype=int), numpy.empty(0)
+    return numpy.concatenate(rows), numpy.concatenate(groups), numpy.concatenate(weights)
+
+def Get_Skinning_Matrices(mesh, armature, mod):
+    data, p_bones = mesh.data, armature.pose.bones
+    count, v_count = len(p_bones), len(mesh.data.vertices)
+    # get the pose matrices of every bone in one go... (they come out column by column so flip them into rows)
+    poses = numpy.empty(count * 16, dtype=numpy.float32)
+    p_bones.foreach_get('matrix', poses)
+    poses = poses.reshape(count, 4, 4).transpose(0, 2, 1).astype(numpy.float64)
+    # the pose bones aren't in the same order as the bones, (new ones get added to the end) so the rest matrices come from the pose bones too...
+    rests = numpy.array([numpy.array(p_bone.bone.matrix_local) for p_bone in p_bones]).reshape(count, 4, 4)
+    # each bones deformation from rest to pose, brought into the meshes space...
+    premat = numpy.linalg.inv(numpy.array(armature.matrix_world)) @ numpy.array(mesh.matrix_world)
+    deforms = numpy.linalg.inv(premat) @ poses @ numpy.linalg.inv(rests) @ premat
+    # only vertex groups named after deforming bones count...
+    indices = {p_bone.name : i for i, p_bone in enumerate(p_bones) if p_bone.bone.use_deform}
+    lookup = numpy.full(max(len(mesh.vertex_groups), 1), -1)
+    for vg in mesh.vertex_groups:
+        lookup[vg.index] = indices.get(vg.name, -1)
+    rows, groups, weights = Get_Skinning_Weights(mesh, set(indices) | {mod.vertex_group})
+    cols = lookup[groups] if len(groups) else groups
+    valid = cols >= 0
+    # blend the bone matrices of each vertex by their weights, so skinning any set of coordinates is one multiply per vertex...
+    totals = numpy.bincount(rows[valid], weights[valid], v_count)
+    blended = numpy.zeros((v_count, 12))
+    for i, (row, col) in enumerate([(row, col) for row in range(3) for col in range(4)]):
+        blended[:, i] = numpy.bincount(rows[valid], weights[valid] * deforms[cols[valid], row, col], v_count)
+    blended = blended.reshape(-1, 3, 4)
+    # unweighted vertices don't move and everything else gets normalized...
+    identity = numpy.identity(4)[:3]
+    weighted = totals > 0.0
+    blended[weighted] = blended[weighted] / totals[weighted, None, None]
+    blended[~weighted] = identity
+    # the modifiers own vertex group fades the deformation in and out...
+    if mod.vertex_group in mesh.vertex_groups:
+        masked = groups == mesh.vertex_groups[mod.vertex_group].index
+        factors = numpy.zeros(v_count)
+        factors[rows[masked]] = weights[masked]
+        if mod.invert_vertex_group:
+            factors = 1.0 - factors
+        blended = identity + (blended - identity) * factors[:, None, None]
+    return blended
+
+def Get_Skinned_Coordinates(blended, coordinates):
+    co = coordinates.reshape(-1, 3).astype(numpy.float64)
+    return (numpy.einsum('vij,vj->vi', blended[:, :, :3], co) + blended[:, :, 3]).astype(numpy.float32).ravel()
+
+def Set_Skinned_Coordinates(mesh, armature, mod):
+    data = mesh.data
+    blended = Get_Skinning_Matrices(mesh, armature, mod)
+    coordinates = numpy.empty(len(data.vertices) * 3, dtype=numpy.float32)
+    # skinning is linear, so skinning every shape key keeps their deltas relative to the skinned basis...
+    if data.shape_keys:
+        for key in data.shape_keys.key_blocks:
+            key.data.foreach_get('co', coordinates)
+            key.data.foreach_set('co', Get_Skinned_Coordinates(blended, coordinates))
+        data.shape_keys.reference_key.data.foreach_get('co', coordinates)
+    else:
+        data.vertices.foreach_get('co', coordinates)
+        coordinates = Get_Skinned_Coordinates(blended, coordinates)
+    data.vertices.foreach_set('co', coordinates)
+    data.update()
+
+def Get_Uses_BBones(armature, mesh):
+    # skinning ourselves only does rigid bones, any bendy bone deforming the mesh needs the armature modifier...
+    return any(bone.use_deform and bone.bbone_segments > 1 and bone.name in mesh.vertex_groups for bone in armature.data.bones)
+
+def Apply_Mesh_Posing(armature, keep_original, skinned=False):
     bpy.ops.object.mode_set(mode='OBJECT')
     # get all the meshes...
-    meshes = [m for m in bpy.context.scene.objects if m.type == 'MESH' and any(mod.type == 'ARMATURE' and mod.object == armature for mod in m.modifiers)]
-    # if we want to keep the orignal meshes...
+    meshes = Get_Armature_Meshes(armature)
+    # if we want to keep the orignal meshes work on copies of them...
     if keep_original:
-        # select them all...
-        for mesh in meshes:
-            mesh.select_set(True)
-        # deselect the armature...
-        bpy.context.view_layer.objects.active = meshes[0]
-        armature.select_set(False)
-        # duplicate all the meshes...
-        bpy.ops.object.duplicate()
-        # reset the meshes list to be the duped meshes...
-        meshes = [m for m in bpy.context.selected_objects if m.type == 'MESH']
-        # make the armature active again...
-        bpy.context.view_layer.objects.active = armature
-        armature.select_set(True)
-    # iterate through all meshes...
+        meshes = Copy_Meshes(meshes)
+    written = set()
+    # skin any meshes that only use vertex group weights ourselves if we want to, (envelopes, preserve volume and bendy bones need the depsgraph)
+    # shape keyed meshes always get skinned when they can be, it's much quicker than evaluating every key...
     for mesh in meshes:
-        # iterate through it's modifiers...
-        for mod in mesh.modifiers:
-            # if it's an armature modifier targeting the retarget target...
-            if mod.type == 'ARMATURE' and mod.object == armature:
-                # apply and re-add armature modifiers...
-                mod_name = mod.name
-                context = bpy.context.copy()    
-                context["object"] = mesh
-                bpy.ops.object.modifier_apply(context, modifier=mod_name)
-                arm = mesh.modifiers.new(type='ARMATURE', name=mod_name)
-                arm.object = armature
-                mesh.select_set(False)
+        mod = [mod for mod in mesh.modifiers if mod.type == 'ARMATURE' and mod.object == armature][0]
+        if (skinned or mesh.data.shape_keys) and mesh.data not in written:
+            if mod.use_vertex_groups and not (mod.use_bone_envelopes or mod.use_deform_preserve_volume or mod.use_multi_modifier or Get_Uses_BBones(armature, mesh)):
+                Set_Skinned_Coordinates(mesh, armature, mod)
+                written.add(mesh.data)
+    meshes = [mesh for mesh in meshes if mesh.data not in written]
+    # write the posed vertex positions straight into the mesh data, the armature modifiers stay where they are in the stack...
+    for mesh, keys in Get_Posed_Keys(armature, meshes).items():
+        # meshes that share their data only need it writing once... (and only if the basis could be evaluated)
+        if mesh.data not in written and 0 in keys:
+            Set_Posed_Coordinates(mesh, keys)
+            written.add(mesh.data)
     # go into pose mode...
+    bpy.context.view_layer.objects.active = armature
     bpy.ops.object.mode_set(mode='POSE')
     # apply the pose...
     bpy.ops.pose.armature_apply(selected=False)
\ No newline at end of file
@@ -3,7 +3,7 @@ from bpy.props import (StringProperty, BoolProperty, PointerProperty, IntPropert
 from . import _functions_
 
 class JK_OT_Apply_Posing(bpy.types.Operator):
-    """Applies armature pose to rest with meshes. (Will apply pose on ALL armature bones)"""
+    """Applies armature pose to rest with meshes. (Will apply pose on ALL armature bones, shape keyed meshes that can't be skinned directly get every key evaluated through their armature modifier)"""
     bl_idname = "jk.apply_mesh_posing"
     bl_label = "Apply Mesh Pose"
     bl_options = {'REGISTER', 'UNDO'}
@@ -19,9 +19,12 @@ class JK_OT_Apply_Posing(bpy.types.Operator):
     Keep_original: BoolProperty(name="Keep Original", description="Keep original meshes instead of replacing them",
         default=False, options=set())
 
+    Skinned: BoolProperty(name="Skin Meshes", description="Deform every mesh with the armatures vertex group weights directly. (Only shape keyed meshes get skinned directly if False, the rest evaluate their armature modifiers through the depsgraph, as do meshes using envelopes, preserve volume or bendy bones)",
+        default=False, options=set())
+
     def execute(self, context):
         armature = bpy.context.view_layer.objects.active
-        _functions_.Apply_Mesh_Posing(armature, self.Keep_original)
+        _functions_.Apply_Mesh_Posing(armature, self.Keep_original, skinned=self.Skinned)
         if 'BLEND-ArmatureActiveRetargeting' in bpy.context.preferences.addons.keys():        
             AAR = armature.data.AAR
             if self.Orient_rot or self.Orient_sca:
@@ -58,6 +61,8 @@ class JK_OT_Apply_Posing(bpy.types.Operator):
             col = row.column()
             col.prop(self, "Orient_source")
             col.enabled = True if 'BLEND-ArmatureControlBones' in addons and any(b.ACB.Type != 'NONE' for b in target.data.bones) else False
-        layout.prop(self, "Keep_original")
+        row = layout.row()
+        row.prop(self, "Keep_original")
+        row.prop(self, "Skinned")
 
     
\ No newline at end of file
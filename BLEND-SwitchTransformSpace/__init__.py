@@ -40,14 +40,14 @@ bl_info = {
 #
 # It just doesn't make sense that we can't switch between world, object and local spaces!
 #
-# Currently STS does not support fcurve modifiers and drivers, it simply swaps fcurves and keyframes between rotation modes...
+# Currently STS does not evaluate constraints or drivers, it bakes the keyed transforms of every frame into the new space... (bone inheritance settings are respected)
 # I have not tested this with NLA strips so it might not work on those either and key handles are being swapped as close as possible.
 
 import bpy
 
 from bpy.utils import (register_class, unregister_class)
 
-from . import (_functions_, _properties_, _operators_)
+from . import (_functions_, _properties_, _operators_, _channels_)
 
 JK_STS_classes = (_properties_.JK_STS_Operator_Props, _operators_.JK_OT_Set_Action_Transform_Space)
 
@@ -55,10 +55,24 @@ def register():
     for cls in JK_STS_classes:
         register_class(cls)
 
+    if _functions_.Space_Cache_Update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_functions_.Space_Cache_Update)
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update not in handlers:
+            handlers.append(_channels_.Channel_Index_Update)
+
     bpy.types.DOPESHEET_MT_key.append(_functions_.Add_To_Menu)
         
 def unregister():
     for cls in reversed(JK_STS_classes):
         unregister_class(cls)
+
+    if _functions_.Space_Cache_Update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_functions_.Space_Cache_Update)
+    _functions_.Clear_Space_Cache()
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        if _channels_.Channel_Index_Update in handlers:
+            handlers.remove(_channels_.Channel_Index_Update)
+    _channels_.Clear_Channel_Index()
     
     bpy.types.DOPESHEET_MT_key.remove(_functions_.Add_To_Menu)
\ No newline at end of file
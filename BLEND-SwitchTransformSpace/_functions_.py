@@ -1,5 +1,17 @@
 import bpy
 import mathutils
+import numpy
+import time
+
+from bpy.app.handlers import persistent
+
+from . import (_kernels_, _channels_, _poses_)
+
+# forward kinematic matrix caches by armature pointer, each holding the key (pointer, frame, update count) it was built at...
+Space_caches = {}
+
+# how many times the depsgraph has updated each object, bumped by the depsgraph handler...
+Space_updates = {}
 
 # adds operator to menu...
 def Add_To_Menu(self, context):
@@ -22,36 +34,65 @@ def Get_Space_Rotation(matrix, mode):
 def Get_Space_Scale(matrix):
     return matrix.to_scale()
 
+def Get_Space_Cache(armature):
+    pointer = armature.as_pointer()
+    key, cache = (pointer, bpy.context.scene.frame_current, Space_updates.get(pointer, 0)), Space_caches.get(pointer)
+    # if the armature has changed frame or been updated since we last looked the cache needs rebuilding...
+    if cache == None or cache['key'] != key:
+        p_bones = armature.pose.bones
+        count = len(p_bones)
+        poses, bases = numpy.empty(count * 16, dtype=numpy.float32), numpy.empty(count * 16, dtype=numpy.float32)
+        # which only takes one read of every pose bone matrix... (they come out column by column so flip them into rows)
+        p_bones.foreach_get('matrix', poses)
+        p_bones.foreach_get('matrix_basis', bases)
+        poses, bases = poses.reshape(count, 4, 4).transpose(0, 2, 1), bases.reshape(count, 4, 4).transpose(0, 2, 1)
+        cache = Space_caches[pointer] = {'key' : key, 'indices' : {pb.name : i for i, pb in enumerate(p_bones)}, 
+            'WORLD' : numpy.array(armature.matrix_world) @ poses, 'OBJECT' : poses, 'LOCAL' : bases}
+    return cache
+
+def Clear_Space_Cache(armature=None):
+    # anything that moves bones without the depsgraph knowing yet should clear the cache...
+    if armature == None:
+        Space_caches.clear()
+    elif armature.as_pointer() in Space_caches:
+        del Space_caches[armature.as_pointer()]
+
+@persistent
+def Space_Cache_Update(scene, depsgraph):
+    # count the updates of any objects that got their transforms or data changed...
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            pointers = [update.id.original.as_pointer()]
+        # armature data changing affects every object using it...
+        elif isinstance(update.id, bpy.types.Armature):
+            pointers = [ob.as_pointer() for ob in scene.objects if ob.data == update.id.original]
+        else:
+            continue
+        for pointer in pointers:
+            Space_updates[pointer] = Space_updates.get(pointer, 0) + 1
+
 def Get_Space_Matrix(item, space):
     # if we need to get matrix from a pose bone...
     if item.rna_type.name == "Pose Bone":
-        # world space is object world matrix combined with pose bone matrix and object space is the pose bones matrix...
-        matrix = item.id_data.matrix_world @ item.matrix if space == 'WORLD' else item.matrix if space == 'OBJECT' else None
+        # world, object and local matrices of every bone come from the armatures cache... 
+        cache = Get_Space_Cache(item.id_data)
+        matrix = mathutils.Matrix(cache[space][cache['indices'][item.name]].tolist())
     # or if we are getting it from an object...
     elif item.rna_type.name == "Object":
         # world space and object space are already accessible matrices...
         matrix = item.matrix_world if space == 'WORLD' else item.matrix_local if space == 'OBJECT' else None
     return matrix
 
-
-
-
-
 def Get_Rotation_Curves(action, rot_path_from, selection, object_curves):
-    rotation_curves = []
-    # if we have a pose bone selection to process...
-    if len(selection) > 0:
-        rotation_curves = rotation_curves + [fcurve for fcurve in action.fcurves 
-            if any(p_bone.name in fcurve.data_path for p_bone in selection) 
-            and any(fcurve.data_path.endswith(mode) for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle'])]
-    # if we want to edit the object rotation curves...
-    if object_curves:
-        rotation_curves = rotation_curves + [fcurve for fcurve in action.fcurves 
-            if any(fcurve.data_path == mode for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle'])]
-    # organise fcurves by their data paths...
-    curves_by_mode = {mode : {fcurve.data_path : {fc.array_index : fc for fc in rotation_curves if fc.data_path == fcurve.data_path} 
-        for fcurve in rotation_curves if fcurve.data_path.endswith(mode)} 
-        for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle']}  
+    # the selected pose bone names and an empty name if we want to edit the object rotation curves...
+    names = [p_bone.name for p_bone in selection] + ([""] if object_curves else [])
+    curves_by_mode = {mode : {} for mode in ['rotation_euler', 'rotation_quaternion', 'rotation_axis_angle']}
+    # organise fcurves by their data paths, looking them up from the actions channel index...
+    for name in names:
+        for mode, curves in curves_by_mode.items():
+            channels = _channels_.Get_Channel_Curves(action, name, mode)
+            if channels:
+                curves[channels[min(channels)].data_path] = channels
     
     return curves_by_mode
 
@@ -147,5 +188,90 @@ def Set_Rotation_Curves(action, mode_from, mode_to, remove, selection, object_cu
             if remove and not (is_from_euler and is_to_euler):
                 for fcurve in [fc for fc in action.fcurves if fc.data_path == d_path]:
                     action.fcurves.remove(fcurve)
+    # the curves we removed and re-added aren't caught by the fcurve count...
+    _channels_.Clear_Channel_Index(action)
     # get rid of the copy we operated on...
-    bpy.data.actions.remove(action_copy)
\ No newline at end of file
+    _channels_.Clear_Channel_Index(action_copy)
+    bpy.data.actions.remove(action_copy)
+
+def Set_Baked_Curves(action, name, item, frames, matrices):
+    # decompose the matrices and write them back into the channels, rotations kept continuous in the items rotation mode...
+    # (removing and re-adding curves isn't caught by the fcurve count, callers clear the channel index once everything is written)
+    locations, quats, scales = _poses_.Get_Transforms_From_Matrices(matrices)
+    rot_mode, rot_path = item.rotation_mode, _poses_.Get_Rotation_Path(item.rotation_mode)
+    rotations = _kernels_.Get_Converted_Rotations(quats, 'QUATERNION', rot_mode, continuous=True)
+    for kind, values in [("location", locations), (rot_path, rotations), ("scale", scales)]:
+        data_path = item.path_from_id(kind)
+        curves = _channels_.Get_Channel_Curves(action, name, kind)
+        for i in range(values.shape[1]):
+            # the old curves in this channel get replaced by the baked ones...
+            if i in curves:
+                action.fcurves.remove(curves[i])
+            fcurve = action.fcurves.new(data_path, index=i, action_group=name if name else "Object Transforms")
+            fcurve.keyframe_points.add(len(frames))
+            fcurve.keyframe_points.foreach_set('co', numpy.column_stack((frames, values[:, i])).astype(numpy.float32).ravel())
+            fcurve.update()
+
+def Get_Pose_Matrices(armature, action, names, mode_from, frames):
+    # export the named bones and their parents and evaluate their object space pose matrices over all the frames...
+    export = _poses_.Get_Pose_Export(armature, action, frames, names=names)
+    # the bones we are switching have their channels keyed in the space we are switching from...
+    posed = numpy.isin(export['names'], names) if mode_from != 'LOCAL' else None
+    bases = export['bases']
+    if mode_from == 'WORLD':
+        bases[:, posed] = numpy.linalg.inv(export['world']) @ bases[:, posed]
+    poses = _poses_.Get_Evaluated_Poses(export['rests'], export['parents'], bases, posed=posed, inherits=export['inherits'])
+    return export, poses
+
+def Get_Local_Matrices(export, poses, indices):
+    # take the object space poses of the indexed bones back into local space through whatever they inherit from their parents...
+    rests, parents, inherits = export['rests'], export['parents'], export['inherits']
+    offsets, frames = _poses_.Get_Rest_Offsets(rests, parents), len(poses)
+    matrices = numpy.empty((frames, len(indices), 4, 4))
+    # (roots don't have parent poses to inherit from)
+    for rows in [numpy.flatnonzero(parents[indices] < 0), numpy.flatnonzero(parents[indices] >= 0)]:
+        if len(rows):
+            level = indices[rows]
+            transforms = _poses_.Get_Parent_Transforms(offsets[level], rests[parents[level]], poses[:, parents[level]] if parents[level[0]] >= 0 else None, 
+                {key : flags[level] for key, flags in inherits.items()}, frames)
+            matrices[:, rows] = _poses_.Get_Applied_Transforms(_poses_.Get_Inverted_Transforms(transforms), poses[:, level])
+    return matrices
+
+def Set_Bone_Spaces(armature, action, names, mode_from, mode_to, frames):
+    export, poses = Get_Pose_Matrices(armature, action, names, mode_from, frames)
+    indices = numpy.array([export['names'].index(name) for name in names], dtype=int)
+    # work out all the new channels before writing any, parents still need to be read in their old space...
+    if mode_to == 'WORLD':
+        baked = export['world'] @ poses[:, indices]
+    elif mode_to == 'OBJECT':
+        baked = poses[:, indices]
+    else:
+        baked = Get_Local_Matrices(export, poses, indices)
+    for i, name in enumerate(names):
+        Set_Baked_Curves(action, name, armature.pose.bones[name], frames, baked[:, i])
+    # the index only needs clearing once all the bones are written...
+    _channels_.Clear_Channel_Index(action)
+
+def Get_Object_Space(obj, space):
+    # objects only need a fixed matrix for each space, local is the basis...
+    parent = numpy.array(obj.parent.matrix_world) if obj.parent else numpy.identity(4)
+    return (parent @ numpy.array(obj.matrix_parent_inverse) if space == 'WORLD' else 
+        numpy.array(obj.matrix_parent_inverse) if space == 'OBJECT' else numpy.identity(4))
+
+def Set_Object_Space(obj, action, mode_from, mode_to, frames):
+    basis = _poses_.Get_Transform_Samples(action, obj, "", frames)
+    matrices = numpy.linalg.inv(Get_Object_Space(obj, mode_to)) @ Get_Object_Space(obj, mode_from) @ basis
+    Set_Baked_Curves(action, "", obj, frames, matrices)
+    _channels_.Clear_Channel_Index(action)
+
+def Set_Transform_Space_Curves(action, mode_from, mode_to, armature, names, objects):
+    start = time.perf_counter()
+    # bake every frame in the actions range...
+    frames = numpy.arange(numpy.floor(action.frame_range[0]), numpy.ceil(action.frame_range[1]) + 1.0)
+    names = [name for name in names if name in armature.data.bones] if armature else []
+    if names:
+        Set_Bone_Spaces(armature, action, names, mode_from, mode_to, frames)
+    for obj in objects:
+        Set_Object_Space(obj, action, mode_from, mode_to, frames)
+    print("Switched " + str(len(names)) + " bones and " + str(len(objects)) + " objects of " + action.name + " from " + mode_from + " to " + mode_to 
+        + " space over " + str(len(frames)) + " frames in " + str(round(time.perf_counter() - start, 3)) + " seconds...")
\ No newline at end of file
@@ -3,9 +3,10 @@ from bpy.props import PointerProperty
 from . import (_functions_, _properties_)
 
 class JK_OT_Set_Action_Transform_Space(bpy.types.Operator):
-    """Switch the rotation mode of keyframed fcurves on selected bones. (and optionally object rotations)"""
-    bl_idname = "jk.switch_rotation_mode"
-    bl_label = "Switch Rotation Mode"
+    """Switch the transform space of keyframed fcurves on selected bones. (and optionally objects)"""
+    bl_idname = "jk.switch_transform_space"
+    bl_label = "Switch Transform Space"
+    bl_options = {'REGISTER', 'UNDO'}
     
     Props: PointerProperty(type=_properties_.JK_STS_Operator_Props)
     
@@ -14,36 +15,21 @@ class JK_OT_Set_Action_Transform_Space(bpy.types.Operator):
         if self.Props.Mode_from != self.Props.Mode_to and (self.Props.name in bpy.data.actions if self.Props.Single else True):
             # get the actions...
             actions = [bpy.data.actions[self.Props.name]] if self.Props.Single else [action for action in bpy.data.actions]
-            # get the selected pose bones if possible...
-            selection = [p_bone for p_bone in bpy.context.selected_pose_bones] if self.Props.Selected else []
-            # get objects that have active actions that will be edited...
-            objects = [ob for ob in bpy.data.objects if ob.animation_data and any(ob.animation_data.action == action for action in actions)]  
-            # set the selected pose bones rotation modes to the mode we are switching from...
-            for selected in selection:
-                selected.rotation_mode = self.Props.Mode_from
-            # if we are editing object fcurves... 
-            if self.Props.Object:
-                # set object rotation modes to the mode we are switching from...
-                for obj in objects:
-                    obj.rotation_mode = self.Props.Mode_from
-            # iterate over actions switching their rotation mode...
+            # get the selected pose bones and their armature if possible...
+            selection = [p_bone for p_bone in bpy.context.selected_pose_bones] if self.Props.Selected and bpy.context.selected_pose_bones else []
+            armature = selection[0].id_data if selection else None
+            # iterate over actions baking them into the new space...
             for action in actions:
-                _functions_.Set_Rotation_Curves(action, self.Props.Mode_from, self.Props.Mode_to, self.Props.Remove, selection, self.Props.Object)
-            # set the selected pose bones rotation modes to the mode we are switching to...
-            for selected in selection:
-                selected.rotation_mode = self.Props.Mode_to
-            # if we are editing object fcurves... 
-            if self.Props.Object:
-                # set object rotation modes to the mode we are switching to...  
-                for obj in objects:
-                    obj.rotation_mode = self.Props.Mode_to
+                # get objects that have this action active if we are editing their curves...
+                objects = [ob for ob in bpy.data.objects if ob.animation_data and ob.animation_data.action == action] if self.Props.Object else []
+                _functions_.Set_Transform_Space_Curves(action, self.Props.Mode_from, self.Props.Mode_to, armature, [p_bone.name for p_bone in selection], objects)
         # if we can't execute...
         else:
             # explain why...
             if self.Props.Mode_from == self.Props.Mode_to:
-                print("'Set Action Rotation Mode' can't execute if 'Mode to' is the same as the 'Mode from'...")
+                print("'Set Action Transform Space' can't execute if 'Mode to' is the same as the 'Mode from'...")
             if self.Props.name not in bpy.data.actions:
-                print("'Set Action Rotation Mode' can't execute without a valid action...")
+                print("'Set Action Transform Space' can't execute without a valid action...")
         # job done!
         return {'FINISHED'}
     
@@ -61,7 +47,6 @@ class JK_OT_Set_Action_Transform_Space(bpy.types.Operator):
         layout = self.layout
         row = layout.row()
         row.prop(self.Props, "Single")
-        row.prop(self.Props, "Remove")
         row = layout.row()
         row.prop_search(self.Props, "name", bpy.data, "actions", text="Action")
         # disable the action selection if we aren't doing a single action...
@@ -0,0 +1,233 @@
+import numpy
+
+from . import (_kernels_, _channels_)
+
+# the array pose evaluator, sampled transforms go in and whole hierarchies of matrices come out...
+
+# this module is shared by Switch Transform Space and Armature Active Retargeting, keep the copies identical and copy any change to both of them...
+
+def Get_Rotation_Path(mode):
+    return "rotation_quaternion" if mode == 'QUATERNION' else "rotation_axis_angle" if mode == 'AXIS_ANGLE' else "rotation_euler"
+
+def Get_Channel_Samples(action, name, kind, defaults, frames):
+    # evaluate a transform channels curves over the frames, falling back on the current values where there's no curve...
+    curves = _channels_.Get_Channel_Curves(action, name, kind)
+    samples = numpy.empty((len(frames), len(defaults)))
+    for i, default in enumerate(defaults):
+        samples[:, i] = [curves[i].evaluate(frame) for frame in frames] if i in curves else default
+    return samples
+
+def Get_Transform_Samples(action, item, name, frames):
+    # sample the location, rotation (as quaternions) and scale of a pose bone or object into 4x4 matrices...
+    rot_mode, rot_path = item.rotation_mode, Get_Rotation_Path(item.rotation_mode)
+    locations = Get_Channel_Samples(action, name, "location", item.location[:], frames)
+    rotations = Get_Channel_Samples(action, name, rot_path, getattr(item, rot_path)[:], frames)
+    scales = Get_Channel_Samples(action, name, "scale", item.scale[:], frames)
+    quats = _kernels_.Get_Converted_Rotations(rotations, rot_mode, 'QUATERNION')
+    return Get_Matrices_From_Transforms(locations, quats, scales)
+
+def Get_Pose_Export(armature, action, frames, names=None):
+    # export everything the pose evaluator needs into flat arrays in one go, (just the named bones and their parents if we are given names)
+    bones = armature.data.bones
+    if names != None:
+        chain = set()
+        for name in names:
+            chain.update([name] + [parent.name for parent in bones[name].parent_recursive])
+        bones = [bone for bone in bones if bone.name in chain]
+    indices = {bone.name : i for i, bone in enumerate(bones)}
+    return {'names' : [bone.name for bone in bones], 'frames' : frames, 'world' : numpy.array(armature.matrix_world),
+        'parents' : numpy.array([indices[bone.parent.name] if bone.parent else -1 for bone in bones], dtype=int),
+        'rests' : numpy.array([numpy.array(bone.matrix_local) for bone in bones]).reshape(len(bones), 4, 4),
+        'bases' : numpy.stack([Get_Transform_Samples(action, armature.pose.bones[bone.name], bone.name, frames) for bone in bones], axis=1) 
+            if bones else numpy.empty((len(frames), 0, 4, 4)), 'inherits' : Get_Inherit_Flags(bones)}
+
+# the inherit scale modes in the order Blender numbers them...
+Inherit_scales = ['FULL', 'FIX_SHEAR', 'ALIGNED', 'AVERAGE', 'NONE', 'NONE_LEGACY']
+
+def Get_Inherit_Flags(bones):
+    # whether each bone inherits its parents rotation and uses local location, and how it inherits scale...
+    return {'rotations' : numpy.array([bone.use_inherit_rotation for bone in bones], dtype=bool), 
+        'scales' : numpy.array([Inherit_scales.index(bone.inherit_scale) for bone in bones], dtype=int),
+        'locations' : numpy.array([bone.use_local_location for bone in bones], dtype=bool)}
+
+def Get_Bone_Depths(parents):
+    # how many parents each bone has, every bone at once one generation at a time... (parents of -1 are roots)
+    depths, current = numpy.zeros(len(parents), dtype=int), parents.copy()
+    while numpy.any(current >= 0):
+        has_parent = current >= 0
+        depths[has_parent] += 1
+        current[has_parent] = parents[current[has_parent]]
+    return depths
+
+def Get_Rest_Offsets(rests, parents):
+    # rest matrices relative to their parents rest matrix, roots stay relative to the armature...
+    offsets, has_parent = rests.copy(), parents >= 0
+    offsets[has_parent] = numpy.linalg.inv(rests[parents[has_parent]]) @ rests[has_parent]
+    return offsets
+
+def Get_Axis_Lengths(matrices):
+    # the lengths of the x, y and z axes of 4x4 matrices... (mat4_to_size)
+    return numpy.sqrt(numpy.einsum('...ij,...ij->...j', matrices[..., :3, :3], matrices[..., :3, :3]))
+
+def Get_Sheared_Lengths(matrices):
+    # axis lengths scaled so their product is the matrices volume, which takes shear into account... (mat4_to_size_fix_shear)
+    lengths = Get_Axis_Lengths(matrices)
+    volumes = numpy.prod(lengths, axis=-1)
+    dets = numpy.abs(numpy.linalg.det(matrices[..., :3, :3]))
+    return lengths * numpy.cbrt(numpy.where(volumes != 0.0, dets / numpy.where(volumes != 0.0, volumes, 1.0), 1.0))[..., None]
+
+def Get_Normalized_Axes(vectors):
+    lengths = numpy.sqrt(numpy.einsum('...i,...i->...', vectors, vectors))
+    return vectors / numpy.where(lengths != 0.0, lengths, 1.0)[..., None], lengths
+
+def Get_Orthogonal_Matrices(matrices, normalize):
+    # remove the shear from 4x4 matrices keeping the y axis direction, (orthogonalize_m4_stable around y) and maybe their scale too...
+    matrices = matrices.copy()
+    y, y_lengths = Get_Normalized_Axes(matrices[..., :3, 1])
+    x, x_lengths = Get_Normalized_Axes(matrices[..., :3, 0])
+    z, z_lengths = Get_Normalized_Axes(matrices[..., :3, 2])
+    x, _ = Get_Normalized_Axes(x - y * numpy.einsum('...i,...i->...', x, y)[..., None])
+    z = z - y * numpy.einsum('...i,...i->...', z, y)[..., None]
+    z, _ = Get_Normalized_Axes(z - x * numpy.einsum('...i,...i->...', z, x)[..., None])
+    if not normalize:
+        x, y, z = x * x_lengths[..., None], y * y_lengths[..., None], z * z_lengths[..., None]
+    matrices[..., :3, 0], matrices[..., :3, 1], matrices[..., :3, 2] = x, y, z
+    return matrices
+
+def Get_Parent_Transforms(offsets, rests, poses, inherits, frames):
+    # the rotation/scale and location matrices and the scale applied after them that a generation of bones gets posed by, (like BKE_bone_parent_transform_calc_from_matrices)
+    # from their rest offsets (bones, 4, 4), their parents rest matrices (bones, 4, 4) and their parents poses (frames, bones, 4, 4), or None if they are roots...
+    count = len(offsets)
+    posts = numpy.ones((frames, count, 3))
+    no_locals = ~inherits['locations']
+    if poses is None:
+        # roots only have their rest offsets, (and if they don't use local location they only take its translation)
+        rotscales = numpy.broadcast_to(offsets, (frames, count, 4, 4)).copy()
+        locs = rotscales.copy()
+        locs[:, no_locals, :3, :3] = numpy.identity(3)
+        return rotscales, locs, posts
+    rotations, scales = inherits['rotations'], inherits['scales']
+    fulls = rotations & (scales == 0)
+    # bones that don't inherit rotation start from their parents rest, everything else starts from their parents pose...
+    parents = numpy.where(rotations[None, :, None, None], poses, rests[None])
+    # which get their scale and shear dealt with depending on how they inherit it...
+    rows = rotations & ((scales == 3) | (scales == 4))
+    parents[:, rows] = Get_Orthogonal_Matrices(parents[:, rows], True)
+    rows = rotations & (scales == 2)
+    parents[:, rows] = Get_Orthogonal_Matrices(parents[:, rows], False)
+    posts[:, rows] = Get_Axis_Lengths(parents[:, rows])
+    parents[:, rows, :3, :3] /= numpy.where(posts[:, rows] != 0.0, posts[:, rows], 1.0)[:, :, None, :]
+    rows = rotations & (scales == 5)
+    parents[:, rows, :3, :3] /= numpy.where(Get_Axis_Lengths(parents[:, rows]) != 0.0, Get_Axis_Lengths(parents[:, rows]), 1.0)[:, :, None, :]
+    rows = ~rotations & (scales == 0)
+    parents[:, rows, :3, :3] *= Get_Axis_Lengths(poses[:, rows])[:, :, None, :]
+    rows = ~rotations & (scales == 1)
+    parents[:, rows, :3, :3] *= Get_Sheared_Lengths(poses[:, rows])[:, :, None, :]
+    rows = ~rotations & (scales == 2)
+    posts[:, rows] = Get_Sheared_Lengths(poses[:, rows])
+    rows = scales == 3
+    parents[:, rows, :3, :3] *= numpy.cbrt(numpy.abs(numpy.linalg.det(poses[:, rows, :3, :3])))[:, :, None, None]
+    rotscales = parents @ offsets[None]
+    rows = ~fulls & (scales == 1)
+    rotscales[:, rows] = Get_Orthogonal_Matrices(rotscales[:, rows], False)
+    # bones that fully inherit are just their parents pose times their rest offset...
+    rotscales[:, fulls] = poses[:, fulls] @ offsets[fulls]
+    # and location always is, unless the bone doesn't use local location... (then it moves along its parents axes)
+    locs = poses @ offsets[None]
+    locs[:, no_locals, :3, :3] = poses[:, no_locals, :3, :3]
+    return rotscales, locs, posts
+
+def Get_Inverted_Transforms(transforms):
+    # inverts parent transforms so applying them takes poses back into local space...
+    rotscales, locs, posts = transforms
+    return numpy.linalg.inv(rotscales), numpy.linalg.inv(locs), numpy.where(posts != 0.0, 1.0 / numpy.where(posts != 0.0, posts, 1.0), 0.0)
+
+def Get_Applied_Transforms(transforms, matrices):
+    # pose local matrices by their parent transforms, the rotation and scale come from one matrix and the location from the other...
+    rotscales, locs, posts = transforms
+    applied = rotscales @ matrices
+    applied[..., :3, 3] = numpy.einsum('...ij,...j->...i', locs[..., :3, :3], matrices[..., :3, 3]) + locs[..., :3, 3]
+    applied[..., :3, :3] *= posts[..., None, :]
+    return applied
+
+def Get_Evaluated_Poses(rests, parents, bases, posed=None, inherits=None):
+    # evaluate the object space pose of every bone on every frame from rest matrices (bones, 4, 4), parent indices (bones) and basis matrices (frames, bones, 4, 4)...
+    # (posed can flag bones whose bases are already object space poses, their children still inherit from them)
+    # (and inherits can give the bones inheritance flags, everything fully inherits from its parent without them)
+    offsets, depths = Get_Rest_Offsets(rests, parents), Get_Bone_Depths(parents)
+    poses = numpy.empty_like(bases)
+    # working down the hierarchy one generation at a time, so every bone at the same depth gets done in one go...
+    for depth in range(depths.max() + 1 if len(depths) else 0):
+        level = numpy.flatnonzero(depths == depth)
+        if inherits is None:
+            local = offsets[level] @ bases[:, level]
+            poses[:, level] = poses[:, parents[level]] @ local if depth > 0 else local
+        else:
+            transforms = Get_Parent_Transforms(offsets[level], rests[parents[level]], poses[:, parents[level]] if depth > 0 else None, 
+                {key : flags[level] for key, flags in inherits.items()}, len(bases))
+            poses[:, level] = Get_Applied_Transforms(transforms, bases[:, level])
+        if posed is not None and numpy.any(posed[level]):
+            overrides = level[posed[level]]
+            poses[:, overrides] = bases[:, overrides]
+    return poses
+
+def Get_Multiplied_Quaternions(a, b):
+    # the hamilton product of two arrays of quaternions, (a @ b for every pair)
+    aw, ax, ay, az = a[:, 0], a[:, 1], a[:, 2], a[:, 3]
+    bw, bx, by, bz = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    return numpy.stack((aw * bw - ax * bx - ay * by - az * bz, aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx, aw * bz + ax * by - ay * bx + az * bw), axis=1)
+
+def Get_Slerped_Quaternions(a, b, factors):
+    # spherical interpolation from a to b by the factors, taking the short way round... (falls back to a normalized lerp when they are nearly the same)
+    dots = numpy.einsum('ij,ij->i', a, b)
+    b = numpy.where(dots[:, None] < 0.0, -b, b)
+    dots = numpy.clip(numpy.abs(dots), 0.0, 1.0)
+    angles = numpy.arccos(dots)
+    sines = numpy.sin(angles)
+    close = sines < 1e-6
+    safe = numpy.where(close, 1.0, sines)
+    wa = numpy.where(close, 1.0 - factors, numpy.sin((1.0 - factors) * angles) / safe)
+    wb = numpy.where(close, factors, numpy.sin(factors * angles) / safe)
+    return _kernels_.Get_Normalized_Quaternions(a * wa[:, None] + b * wb[:, None])
+
+def Get_Quaternions_From_Matrices(matrices):
+    # rotation matrices indexed [column][row] to quaternions, picking the most stable of the four ways... (like mat3_normalized_to_quat)
+    m, quats = matrices, numpy.empty((len(matrices), 4))
+    trace = 0.25 * (1.0 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2])
+    use_w = trace > 1e-4
+    use_x = ~use_w & (m[:, 0, 0] > m[:, 1, 1]) & (m[:, 0, 0] > m[:, 2, 2])
+    use_y = ~use_w & ~use_x & (m[:, 1, 1] > m[:, 2, 2])
+    use_z = ~use_w & ~use_x & ~use_y
+    s = numpy.sqrt(numpy.maximum(trace[use_w], 0.0))
+    quats[use_w] = numpy.column_stack((s, (m[use_w, 1, 2] - m[use_w, 2, 1]) / (4.0 * s), 
+        (m[use_w, 2, 0] - m[use_w, 0, 2]) / (4.0 * s), (m[use_w, 0, 1] - m[use_w, 1, 0]) / (4.0 * s)))
+    s = 2.0 * numpy.sqrt(numpy.maximum(1.0 + m[use_x, 0, 0] - m[use_x, 1, 1] - m[use_x, 2, 2], 0.0))
+    quats[use_x] = numpy.column_stack(((m[use_x, 1, 2] - m[use_x, 2, 1]) / s, 0.25 * s, 
+        (m[use_x, 1, 0] + m[use_x, 0, 1]) / s, (m[use_x, 2, 0] + m[use_x, 0, 2]) / s))
+    s = 2.0 * numpy.sqrt(numpy.maximum(1.0 + m[use_y, 1, 1] - m[use_y, 0, 0] - m[use_y, 2, 2], 0.0))
+    quats[use_y] = numpy.column_stack(((m[use_y, 2, 0] - m[use_y, 0, 2]) / s, (m[use_y, 1, 0] + m[use_y, 0, 1]) / s, 
+        0.25 * s, (m[use_y, 2, 1] + m[use_y, 1, 2]) / s))
+    s = 2.0 * numpy.sqrt(numpy.maximum(1.0 + m[use_z, 2, 2] - m[use_z, 0, 0] - m[use_z, 1, 1], 0.0))
+    quats[use_z] = numpy.column_stack(((m[use_z, 0, 1] - m[use_z, 1, 0]) / s, (m[use_z, 2, 0] + m[use_z, 0, 2]) / s, 
+        (m[use_z, 2, 1] + m[use_z, 1, 2]) / s, 0.25 * s))
+    # keep w positive, the same as Blender does...
+    quats[quats[:, 0] < 0.0] *= -1.0
+    return _kernels_.Get_Normalized_Quaternions(quats)
+
+def Get_Matrices_From_Transforms(locations, quats, scales):
+    # compose locations, rotations and scales into 4x4 matrices... (these are indexed [row][column] like mathutils so they can be multiplied with @)
+    matrices = numpy.zeros((len(quats), 4, 4))
+    matrices[:, :3, :3] = _kernels_.Get_Matrices_From_Quaternions(quats).transpose(0, 2, 1) * scales[:, None, :]
+    matrices[:, :3, 3], matrices[:, 3, 3] = locations, 1.0
+    return matrices
+
+def Get_Transforms_From_Matrices(matrices):
+    # decompose 4x4 matrices back into locations, rotations and scales... (like Matrix.decompose)
+    locations, basis = matrices[:, :3, 3].copy(), matrices[:, :3, :3]
+    scales = numpy.sqrt(numpy.einsum('nij,nij->nj', basis, basis))
+    rotations = basis / numpy.where(scales != 0.0, scales, 1.0)[:, None, :]
+    # a negative scale gets taken out of all three axes...
+    negative = numpy.linalg.det(rotations) < 0.0
+    rotations[negative], scales[negative] = -rotations[negative], -scales[negative]
+    return locations, Get_Quaternions_From_Matrices(rotations.transpose(0, 2, 1)), scales
@@ -1,4 +1,5 @@
 import bpy
+from . import _functions_
 from bpy.props import (EnumProperty, BoolProperty, StringProperty, CollectionProperty, FloatVectorProperty)
 
 class JK_STS_Operator_Props(bpy.types.PropertyGroup):
@@ -15,8 +16,6 @@ class JK_STS_Operator_Props(bpy.types.PropertyGroup):
         ('WORLD', 'World Space', "Space from world")],
         default='WORLD')
     
-    Remove: BoolProperty(name="Remove Previous",description="Remove fcurves from previous transform space", default=False)
-    
     Single: BoolProperty(name="Single Action", description="Only edit the selected action. (Edit all actions if False)", default=True)
     
     Selected: BoolProperty(name="Edit Selected Bones", description="Edit selected pose bone fcurves. (No bone fcurves will be edited if False)", default=False)
@@ -37,6 +36,8 @@ class JK_STS_Space_Props(bpy.types.PropertyGroup):
         elif self.id_data.rna_type.name == "Object":
             self.id_data.matrix_world.Translation = self.location
             #exec(self.name + ".matrix.Translation = self.location")
+        # the cached space matrices are stale until the depsgraph catches up...
+        _functions_.Clear_Space_Cache(self.id_data)
 
     location: bpy.props.FloatVectorProperty(name="Location", description="", default=(0.0, 0.0, 0.0), 
         precision=3, options={'ANIMATABLE'}, subtype= 'TRANSLATION', unit='NONE', size=3, 
@@ -73,6 +74,7 @@ class JK_STS_Space_Props(bpy.types.PropertyGroup):
                 self.id_data.matrix.Scale = self.scale
         elif self.id_data.rna_type.name == "Object":
             self.id_data.matrix_world.Scale = self.scale
+        _functions_.Clear_Space_Cache(self.id_data)
     
     scale: bpy.props.FloatVectorProperty(name="Scale", description="", default=(0.0, 0.0, 0.0), 
         precision=3, options={'ANIMATABLE'}, subtype= 'XYZ', unit='NONE', size=3, 